@@ -41,6 +41,10 @@ The keys are 'a', 's', 'd', and 'w' to move (or arrow keys).  Have fun!
 """
 from game import GameStateData
 from game import Game
+from game import Configuration
+from game import AgentState
+from game import BitGrid
+from game import reconstituteGrid
 from game import Directions
 from game import Actions
 from util import nearestPoint
@@ -112,7 +116,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( state.data.getWritableAgentState( agentIndex ) )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -200,6 +204,33 @@ class GameState:
         """
         return self.data.layout.walls
 
+    def getMazeDistances(self):
+        """
+        Returns a MazeDistances table (see layout.py) for this board, so
+
+        state.getMazeDistances().getDistance((x1,y1), (x2,y2))
+
+        gives the true maze distance between two positions.  The table is
+        computed once per layout and cached.
+        """
+        return self.data.layout.getMazeDistances()
+
+    def getNeighborTable(self):
+        """
+        Returns a dictionary from each open cell to a tuple of the (next cell,
+        action) pairs for the legal moves out of it (see layout.py).  It is
+        computed once per layout and cached.
+        """
+        return self.data.layout.getNeighborTable()
+
+    def getJunctionGraph(self):
+        """
+        Returns the JunctionGraph (see layout.py) for this board, in which
+        every corridor is one edge between junctions.  It is computed once
+        per layout and cached.
+        """
+        return self.data.layout.getJunctionGraph()
+
     def hasFood(self, x, y):
         return self.data.food[x][y]
 
@@ -247,6 +278,52 @@ class GameState:
 
         return str(self.data)
 
+    def pack( self ):
+        """
+        Returns a compact tuple of plain values describing this state, for
+        sending to another process.  The layout is left out; pass it back to
+        GameState.unpack along with the tuple.
+        """
+        data = self.data
+        agents = tuple([(a.start.pos, a.start.direction, a.configuration.pos, a.configuration.direction,
+                         a.isPacman, a.scaredTimer) for a in data.agentStates])
+        if isinstance(data.food, BitGrid):
+            food = (True, (data.food.width, data.food.height, data.food.bits))
+        else:
+            food = (False, data.food.packBits())
+        return (agents, food, tuple(data.capsules), data.score, data._win, data._lose)
+
+    def unpack( packed, layout ):
+        """
+        Rebuilds a GameState from the result of pack() and its layout.
+        """
+        agents, food, capsules, score, win, lose = packed
+        state = GameState()
+        data = state.data
+        data.layout = layout
+        isBitGrid, food = food
+        if isBitGrid:
+            width, height, bits = food
+            data.food = BitGrid(width, height)
+            data.food.bits = bits
+        else:
+            data.food = reconstituteGrid(food)
+        data.capsules = list(capsules)
+        data.score = score
+        data._win = win
+        data._lose = lose
+        data.agentStates = []
+        for startPos, startDirection, pos, direction, isPacman, scaredTimer in agents:
+            agentState = AgentState( Configuration( startPos, startDirection ), isPacman )
+            agentState.configuration = Configuration( pos, direction )
+            agentState.scaredTimer = scaredTimer
+            data.agentStates.append( agentState )
+        data._eaten = [False for a in data.agentStates]
+        data._ownedAgents = set( range( len( data.agentStates ) ) )
+        data._ownsCapsules = True
+        return state
+    unpack = staticmethod( unpack )
+
     def initialize( self, layout, numGhostAgents=1000 ):
         """
         Creates an initial game state from a layout array (see layout.py).
@@ -331,7 +408,7 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions( state.getPacmanState().configuration, state.data.layout.walls )
+        return Actions.getPossibleActions( state.data.agentStates[0].configuration, state.data.layout.walls )
     getLegalActions = staticmethod( getLegalActions )
 
     def applyAction( state, action ):
@@ -342,7 +419,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.getWritableAgentState( 0 )
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -371,11 +448,11 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+            state.data.getWritableCapsules().remove( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.getWritableAgentState( index ).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -404,7 +481,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.getWritableAgentState( ghostIndex )
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -414,7 +491,10 @@ class GhostRules:
     def decrementTimer( ghostState):
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
+            # Configurations are shared between copies of an agent state, so
+            # snap to the grid with a new one rather than editing it in place
+            conf = ghostState.configuration
+            ghostState.configuration = Configuration( nearestPoint( conf.pos ), conf.direction )
         ghostState.scaredTimer = max( 0, timer - 1 )
     decrementTimer = staticmethod( decrementTimer )
 
@@ -425,12 +505,12 @@ class GhostRules:
                 ghostState = state.data.agentStates[index]
                 ghostPosition = ghostState.configuration.getPosition()
                 if GhostRules.canKill( pacmanPosition, ghostPosition ):
-                    GhostRules.collide( state, ghostState, index )
+                    GhostRules.collide( state, state.data.getWritableAgentState( index ), index )
         else:
             ghostState = state.data.agentStates[agentIndex]
             ghostPosition = ghostState.configuration.getPosition()
             if GhostRules.canKill( pacmanPosition, ghostPosition ):
-                GhostRules.collide( state, ghostState, agentIndex )
+                GhostRules.collide( state, state.data.getWritableAgentState( agentIndex ), agentIndex )
     checkDeath = staticmethod( checkDeath )
 
     def collide( state, ghostState, agentIndex):
@@ -439,6 +519,7 @@ class GhostRules:
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
             # Added for first-person
+            state.data._eaten = state.data._eaten[:]
             state.data._eaten[agentIndex] = True
         else:
             if not state.data._win:
@@ -523,6 +604,8 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      help=default('Number of processes to play games in; more than 1 plays them without graphics'), default=1)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -570,6 +653,8 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['workers'] = options.workers
+    if options.fixRandomSeed: args['seed'] = 'cs188'
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -625,10 +710,13 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=1, seed=None ):
     import __main__
     __main__.__dict__['_display'] = display
 
+    if workers > 1:
+        return runBatch( layout, pacman, ghosts, numGames, record, numTraining, catchExceptions, timeout, workers, seed )
+
     rules = ClassicGameRules(timeout)
     games = []
 
@@ -646,25 +734,103 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         game.run()
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+        if record: recordGame( layout, game, i )
 
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
 
     return games
 
+def recordGame( layout, game, i ):
+    import time, cPickle
+    fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    f = file(fname, 'w')
+    components = {'layout': layout, 'actions': game.moveHistory}
+    cPickle.dump(components, f)
+    f.close()
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+# Arguments of the games played by each batch worker process; see runBatch
+_batchGame = None
+
+def _initBatchWorker( layout, pacman, ghosts, record, catchExceptions, timeout ):
+    "Runs once in each worker process; the arguments are inherited, not pickled"
+    global _batchGame
+    _batchGame = (layout, pacman, ghosts, record, catchExceptions, timeout)
+
+def _playBatchGame( task ):
+    "Plays one game of a batch in a worker process and returns its result"
+    import textDisplay
+    i, gameSeed = task
+    layout, pacman, ghosts, record, catchExceptions, timeout = _batchGame
+    random.seed( gameSeed )
+    rules = ClassicGameRules( timeout )
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions )
+    game.run()
+    if record: recordGame( layout, game, i )
+    return { 'game': i, 'seed': gameSeed, 'score': game.state.getScore(), 'win': game.state.isWin(),
+             'moves': len( [move for move in game.moveHistory if move[0] == 0] ),
+             'agentTime': game.totalAgentTimes[0], 'crashed': game.agentCrashed }
+
+def playBatch( layout, pacman, ghosts, gameNumbers, workers, seed, record=False, catchExceptions=False, timeout=30 ):
+    """
+    Plays the given games without graphics in a pool of worker processes and
+    yields each game's result as soon as it finishes, so not in order.  A
+    result is a dict with the game number, its seed, score, win, the number
+    of moves Pacman made, Pacman's total computation time and whether an
+    agent crashed.
+
+    Game i is played after random.seed('%s-%d' % (seed, i)), so the same
+    seed replays the same games whatever the number of workers, as long as
+    the agents keep no state from one game to the next.  Each worker plays
+    with its own copy of the agents, as they were when the pool started.
+    """
+    import multiprocessing
+    pool = multiprocessing.Pool( workers, _initBatchWorker, (layout, pacman, ghosts, record, catchExceptions, timeout) )
+    try:
+        tasks = [(i, '%s-%d' % (seed, i)) for i in gameNumbers]
+        for result in pool.imap_unordered( _playBatchGame, tasks ):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def runBatch( layout, pacman, ghosts, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=2, seed=None ):
+    """
+    The runGames of more than one worker: training games are played here
+    first, without graphics, and the rest are played by playBatch.  A line is
+    printed as each game finishes, then the usual summary.  Returns the
+    results in game order.
+
+    Agents that start processes of their own (such as a search agent with
+    workers) cannot be used, as pool workers may not have children.
+    """
+    if seed == None: seed = random.randrange( sys.maxint )
+    if numTraining > 0:
+        import textDisplay
+        random.seed( '%s-training' % seed )
+        runGames( layout, pacman, ghosts, textDisplay.NullGraphics(), numTraining, False, numTraining, catchExceptions, timeout )
+
+    results = []
+    for result in playBatch( layout, pacman, ghosts, range( numTraining, numGames ), workers, seed, record, catchExceptions, timeout ):
+        results.append( result )
+        print 'Game %d (seed %s): %s, score %d, %d moves, %.2fs thinking%s' % \
+            (result['game'] + 1, result['seed'], ['Loss', 'Win'][int(result['win'])], result['score'],
+             result['moves'], result['agentTime'], ['', ', agent crashed'][int(result['crashed'])])
+    results.sort( key=lambda result: result['game'] )
+
+    if len( results ) > 0:
+        printSummary( [result['score'] for result in results], [result['win'] for result in results] )
+
+    return results
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
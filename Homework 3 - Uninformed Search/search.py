@@ -72,26 +72,180 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def graphSearch(problem, frontier):
+class SearchNode(object):
+    """
+    A node in the search tree.  Rather than carrying a full copy of the path
+    that reached it, each node keeps a pointer to its parent and the single
+    action taken from there, so pushing a successor is O(1) regardless of
+    how deep it is.  The action list is only rebuilt by getPath() once a goal
+    has been found.
+
+    state  - the search state of this node
+    action - the action taken from the parent to reach this node
+    cost   - the total path cost from the start state to this node
+    parent - the parent SearchNode, or None for the successors of the start
+    """
+    __slots__ = ('state', 'action', 'cost', 'parent')
+
+    def __init__(self, state, action, cost, parent=None):
+        self.state = state
+        self.action = action
+        self.cost = cost
+        self.parent = parent
+
+    def getPath(self):
+        "Returns the list of actions leading from the start state to this node"
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
+class SearchStatistics:
+    """
+    What one search call did:
+
+    algorithm      - the name of the search function
+    expanded       - nodes expanded, i.e. calls to getSuccessors (or
+                     getPredecessors, for the backward half of a search)
+    generated      - the successors those calls returned
+    frontierPeak   - the most nodes on the frontier at once
+    closedPeak     - the most states in the closed set at once, or in
+                     whatever table of reached states the search keeps
+    heuristicCalls - calls to the heuristic
+    heuristicTime  - seconds spent in the heuristic
+    wallTime       - seconds the whole search took
+    peakMemory     - the peak resident memory of the process after the
+                     search, in kilobytes on Linux, or None where the
+                     resource module is missing
+
+    Every search function calls record() once per expansion to keep the two
+    peaks; the rest are filled in by instrumentedSearch.
+    """
+    FIELDS = ['algorithm', 'expanded', 'generated', 'frontierPeak', 'closedPeak',
+              'heuristicCalls', 'heuristicTime', 'wallTime', 'peakMemory']
+
+    def __init__(self, algorithm=None):
+        self.algorithm = algorithm
+        self.expanded, self.generated = 0, 0
+        self.frontierPeak, self.closedPeak = 0, 0
+        self.heuristicCalls, self.heuristicTime = 0, 0.0
+        self.wallTime, self.peakMemory = 0.0, None
+
+    def record(self, frontierSize, closedSize):
+        if frontierSize > self.frontierPeak: self.frontierPeak = frontierSize
+        if closedSize > self.closedPeak: self.closedPeak = closedSize
+
+    def asDict(self):
+        return dict([(field, getattr(self, field)) for field in SearchStatistics.FIELDS])
+
+    def toJson(self):
+        import json
+        return json.dumps(self.asDict(), sort_keys=True)
+
+def getStatistics(problem):
+    """
+    Returns the SearchStatistics that instrumentedSearch is filling in for
+    problem, or a throwaway one when the search is not being instrumented.
+    """
+    return getattr(problem, 'searchStatistics', None) or SearchStatistics()
+
+def instrumentedSearch(searchFunction, problem, heuristic=None, **options):
+    """
+    Runs searchFunction on problem, passing heuristic if one is given and any
+    other options, and returns its path.  The SearchStatistics of the run are
+    left in problem.searchStatistics.
+
+    Expansions are counted by wrapping the problem's getSuccessors and
+    getPredecessors for the length of the search (a call made from inside
+    the other counts once), and the heuristic by wrapping it.
+    """
+    import time
+    stats = SearchStatistics(searchFunction.__name__)
+    problem.searchStatistics = stats
+
+    depth = [0]                             # Nesting of the wrapped methods, so only the outermost call counts
+    def counted(method):
+        def call(state):
+            depth[0] += 1
+            try:
+                successors = method(state)
+            finally:
+                depth[0] -= 1
+            if depth[0] == 0:
+                stats.expanded += 1
+                stats.generated += len(successors)
+            return successors
+        return call
+    names = [name for name in ['getSuccessors', 'getPredecessors'] if hasattr(problem, name)]
+    saved = dict([(name, problem.__dict__[name]) for name in names if name in problem.__dict__])
+    for name in names:
+        setattr(problem, name, counted(getattr(problem, name)))
+
+    if heuristic is not None:
+        def timedHeuristic(state, problem):
+            begin = time.time()
+            value = heuristic(state, problem)
+            stats.heuristicTime += time.time() - begin
+            stats.heuristicCalls += 1
+            return value
+        options['heuristic'] = timedHeuristic
+
+    begin = time.time()
+    try:
+        return searchFunction(problem, **options)
+    finally:
+        stats.wallTime = time.time() - begin
+        for name in names:
+            if name in saved: setattr(problem, name, saved[name])
+            else: delattr(problem, name)
+        try:
+            import resource
+            stats.peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+
+def graphSearch(problem, frontier, costPruning=False):
     """
     Once your DFS, BFS, and UCS algorithms work, unify them
     into a single, iterative graphSearch algorithm that
     requires only an object to manage the fringe.
+
+    With costPruning set, a successor is only pushed if it is not closed and
+    is cheaper than the best path cost found to it so far.  Paired with an
+    IndexedPriorityQueueWithFunction keyed on node.state this keeps a single
+    frontier entry per state for UCS and A*, while expanding states in the
+    same order as the unpruned search.
     """
     "*** YOUR CODE HERE ***"
+    stats = getStatistics(problem)                                  # Keeps the frontier and closed list peaks
     closed = set()                                                  # Create the closed list
+    bestCost = {}                                                   # Cheapest known path cost to each generated state (costPruning only)
     closed.add(problem.getStartState()[0])                          # Add the first node because we "skip" it
     for succ in problem.getSuccessors(problem.getStartState()):     # For each succesor node
-        frontier.push((succ, []))                                   # Add it to the frontier along with an empty list to track the path and a path cost
-    while frontier:                                                 # While there is un-explored path in the frontier
+        if costPruning:                                             # If pruning, skip pushes that are no cheaper than a known path
+            if succ[0] in bestCost and bestCost[succ[0]] <= succ[2]:
+                continue
+            bestCost[succ[0]] = succ[2]
+        frontier.push(SearchNode(succ[0], succ[1], succ[2]))        # Add it to the frontier as a node with no parent
+    while True:                                                     # While true
+        if frontier.isEmpty():                                      # If frontier is empty
+            return []                                               # Return empty list representing no path
         node = frontier.pop()                                       # Get one of the nodes from the frontier
-        if problem.isGoalState(node[0][0]):                         # If the node is the goal state
-            node[1].append(node[0][1])                              # Add that nodes direction to the list of directions
-            return node[1]                                          # Return the list of directions
-        if node[0][0] not in closed:                                # If the current node is not in the closed list
-            closed.add(node[0][0])                                  # Add the nodes coordinates to the closed list
-            for succ in problem.getSuccessors(node[0][0]):          # Get the successor states for the current node, for each successor
-                frontier.push(((succ[0], succ[1], succ[2] + node[0][2]), node[1] + [node[0][1]]))   # Add it to the frontier and add it to the paths history list
+        if problem.isGoalState(node.state):                         # If the node is the goal state
+            return node.getPath()                                   # Walk the parent pointers back to get the list of directions
+        if node.state not in closed:                                # If the current node is not in the closed list
+            closed.add(node.state)                                  # Add the nodes coordinates to the closed list
+            for succ in problem.getSuccessors(node.state):          # Get the successor states for the current node, for each successor
+                cost = succ[2] + node.cost                          # Total path cost of reaching the successor through this node
+                if costPruning:                                     # If pruning, skip closed states and pushes no cheaper than a known path
+                    if succ[0] in closed or (succ[0] in bestCost and bestCost[succ[0]] <= cost):
+                        continue
+                    bestCost[succ[0]] = cost
+                frontier.push(SearchNode(succ[0], succ[1], cost, node))   # Add it to the frontier pointing back at the current node
+            stats.record(len(frontier), len(closed))
 
 def depthFirstSearch(problem):
     """
@@ -121,13 +275,82 @@ def uniformCostSearch(problem):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
     def priFunction(item):
-        return item[0][2]
+        return item.cost
 
-    return graphSearch(problem,util.PriorityQueueWithFunction(priFunction))
+    frontier = util.IndexedPriorityQueueWithFunction(priFunction, lambda node: node.state)
+    return graphSearch(problem, frontier, costPruning=True)
     # util.raiseNotDefined()
 
+def getPredecessors(problem, state):
+    """
+    Returns (predecessor, action, stepCost) triples for the moves that lead
+    into state, using problem.getPredecessors if the problem has one and
+    otherwise assuming every move in getSuccessors can be undone at the same
+    cost.
+    """
+    if hasattr(problem, 'getPredecessors'):
+        return problem.getPredecessors(state)
+    from game import Actions
+    return [(succ, Actions.reverseDirection(action), cost) for succ, action, cost in problem.getSuccessors(state)]
+
+def bidirectionalPath(forwardNode, backwardNode):
+    """
+    Joins the forward path from the start to a meeting state with the
+    backward path from there to the goal.  Either node is None when the
+    meeting state is the start or the goal itself; a backward node's action
+    leads from its state to its parent's.
+    """
+    path = []
+    if forwardNode is not None: path = forwardNode.getPath()
+    while backwardNode is not None:
+        path.append(backwardNode.action)
+        backwardNode = backwardNode.parent
+    return path
+
+def bidirectionalBreadthFirstSearch(problem):
+    """
+    Search outward from both the start and problem.goal, one whole level
+    at a time on the side with the smaller level, until the two searches
+    meet.  The problem must have a single goal state, problem.goal, and moves
+    that can be reversed (see getPredecessors).  Returns a path with the
+    fewest actions, as breadthFirstSearch does.
+    """
+    start, goal = problem.getStartState(), problem.goal
+    if problem.isGoalState(start): return []
+    nodes = ({start: None}, {goal: None})   # State -> SearchNode, from each end
+    depths = ({start: 0}, {goal: 0})        # State -> number of actions from each end
+    levels = [[start], [goal]]              # The deepest level of each search
+    stats = getStatistics(problem)
+    while levels[0] and levels[1]:
+        side = int(len(levels[1]) < len(levels[0]))     # Grow the smaller level
+        other = 1 - side
+        nextLevel = []
+        meeting, bestLength = None, None
+        for state in levels[side]:
+            if side == 0: neighbours = problem.getSuccessors(state)
+            else: neighbours = getPredecessors(problem, state)
+            for succ, action, cost in neighbours:
+                if succ in nodes[side]:
+                    continue
+                parent = nodes[side][state]
+                if parent is not None: cost += parent.cost
+                nodes[side][succ] = SearchNode(succ, action, cost, parent)
+                depths[side][succ] = depths[side][state] + 1
+                nextLevel.append(succ)
+                if succ in nodes[other]:                # The searches meet; keep the shortest joined path of this level
+                    length = depths[side][succ] + depths[other][succ]
+                    if bestLength is None or length < bestLength:
+                        meeting, bestLength = succ, length
+        stats.record(len(nextLevel) + len(levels[other]), len(nodes[0]) + len(nodes[1]))
+        if meeting is not None:
+            problem.isGoalState(goal)                   # Lets the display draw the expanded cells
+            return bidirectionalPath(nodes[0][meeting], nodes[1][meeting])
+        levels[side] = nextLevel
+    return []
+
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 ucs = uniformCostSearch
+bibfs = bidirectionalBreadthFirstSearch
@@ -37,9 +37,12 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
 import util
 import time
 import search
+import layout
+import json
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -68,12 +71,18 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
+      bidirectionalBreadthFirstSearch or bibfs
 
+    The SearchStatistics of the search (see search.py) are kept in
+    self.statistics as a dict, along with the problem, heuristic and path
+    cost.  With statsFile they are also appended to that file as a line of
+    JSON, or printed if it is '-'.
 
-    Note: You should NOT change any code in SearchAgent
+    Note: search functions, problems and heuristics are looked up by name,
+    so new ones in search.py or this file need no change to SearchAgent.
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', statsFile=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -82,7 +91,7 @@ class SearchAgent(Agent):
         func = getattr(search, fn)
         if 'heuristic' not in func.func_code.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: search.instrumentedSearch(func, x)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -92,13 +101,15 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: search.instrumentedSearch(func, x, heuristic=heur)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
             raise AttributeError, prob + ' is not a search problem type in SearchAgents.py.'
         self.searchType = globals()[prob]
         print('[SearchAgent] using problem type ' + prob)
+        self.description = {'function': fn, 'problem': prob, 'heuristic': heuristic}
+        self.statsFile = statsFile
 
     def registerInitialState(self, state):
         """
@@ -116,6 +127,22 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        self.statistics = None
+        if 'searchStatistics' in dir(problem): self.recordStatistics(problem.searchStatistics, totalCost)
+
+    def recordStatistics(self, stats, totalCost):
+        "Keeps the statistics of the search in self.statistics and writes them to statsFile"
+        self.statistics = stats.asDict()
+        self.statistics.update(self.description)
+        self.statistics['cost'] = totalCost
+        if self.statsFile == None: return
+        line = json.dumps(self.statistics, sort_keys=True)
+        if self.statsFile == '-':
+            print(line)
+        else:
+            f = open(self.statsFile, 'a')
+            try: f.write(line + '\n')
+            finally: f.close()
 
     def getAction(self, state):
         """
@@ -133,6 +160,15 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+def displayDrawsExpandedCells():
+    """
+    Returns whether the running display can draw the cells a search has
+    expanded.  Under NullGraphics, the text display or the autograder it
+    cannot, so the search problems only count their expansions.
+    """
+    import __main__
+    return 'drawExpandedCells' in dir(getattr(__main__, '_display', None))
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -151,13 +187,16 @@ class PositionSearchProblem(search.SearchProblem):
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        visualize: Whether to record the expanded cells for the display to
+                   draw; this is turned off when the display cannot draw them
         """
         self.walls = gameState.getWalls()
+        self.neighbors = gameState.getNeighborTable()
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
         self.costFn = costFn
-        self.visualize = visualize
+        self.visualize = visualize and displayDrawsExpandedCells()
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
@@ -192,24 +231,30 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        costFn = self.costFn
+        neighbors = self.neighbors.get(state)
+        if neighbors == None:           # Not an open cell, such as a start given on a wall
+            neighbors = layout.cellNeighbors(self.walls, state)
+        successors = [(nextState, action, costFn(nextState)) for nextState, action in neighbors]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
+        if self.visualize and state not in self._visited:
             self._visited[state] = True
             self._visitedlist.append(state)
 
         return successors
 
+    def getPredecessors(self, state):
+        """
+        Returns the moves into state as (predecessor, action, stepCost)
+        triples, for searches that work back from the goal.  Every move is
+        reversible, so these are the successors with their actions reversed
+        and the cost of entering state.
+        """
+        cost = self.costFn(state)
+        return [(succ, Actions.reverseDirection(action), cost) for succ, action, stepCost in self.getSuccessors(state)]
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -226,6 +271,127 @@ class PositionSearchProblem(search.SearchProblem):
             cost += self.costFn((x,y))
         return cost
 
+class JunctionSearchProblem(search.SearchProblem):
+    """
+    Runs a position search over the junction graph of the layout (see
+    layout.py) instead of over single cells.
+
+    The states are junctions, plus the start and any goal cells so that the
+    search can begin and end inside a corridor.  Each action is the tuple of
+    Directions that walks one corridor; expandActions turns a path of these
+    back into ordinary moves.  Anything else, such as the goal a heuristic
+    looks at, is read from the wrapped problem.
+    """
+
+    def __init__(self, problem, graph):
+        self.problem = problem
+        self.graph = graph
+        corridorCells = set([cell for cell in graph.neighbors if cell not in graph.junctions])
+        goal = getattr(problem, 'goal', None)
+        if goal != None:                # isGoalState would also draw the goal on the display
+            goals = [goal]
+        else:                           # Problems with many goals, like AnyFoodSearchProblem
+            goals = [cell for cell in corridorCells if problem.isGoalState(cell)]
+        self.stops = set([problem.getStartState()] + [cell for cell in goals if cell in corridorCells])
+
+        # Corridor edges with a stop inside them are walked again up to it
+        self.brokenEdges = set()
+        for cell in self.stops:
+            self.brokenEdges.update(graph.corridorEdges.get(cell, []))
+
+        # For display purposes
+        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+
+    def __getattr__(self, name):
+        if name == 'problem': raise AttributeError, name
+        return getattr(self.problem, name)
+
+    def getStartState(self):
+        return self.problem.getStartState()
+
+    def isGoalState(self, state):
+        return self.problem.isGoalState(state)
+
+    def corridors(self, state):
+        "Returns the (next state, actions, cells entered) edges out of state."
+        if state in self.graph.edges:
+            edges = []
+            for i, edge in enumerate(self.graph.edges[state]):
+                if (state, i) in self.brokenEdges:
+                    edge = self.graph.corridor(state, edge[1][0], self.stops)
+                edges.append(edge)
+            return edges
+        return [self.graph.corridor(state, action, self.stops) for nextCell, action in self.graph.neighbors[state]]
+
+    def getSuccessors(self, state):
+        """
+        Returns (successor, actions, stepCost) triples where actions is the
+        tuple of moves along the corridor and stepCost is the cost of every
+        cell it enters.
+        """
+        costFn = self.problem.costFn
+        successors = [(nextState, actions, sum([costFn(cell) for cell in cells]))
+                      for nextState, actions, cells in self.corridors(state)]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if self.visualize and state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return successors
+
+    def getPredecessors(self, state):
+        """
+        Returns the corridors into state, found by walking each corridor out
+        of it and reversing the moves.  The cost is that of the cells entered
+        on the way back, which ends with state itself.
+        """
+        costFn = self.problem.costFn
+        predecessors = []
+        for prevState, actions, cells in self.corridors(state):
+            reverse = tuple([Actions.reverseDirection(action) for action in reversed(actions)])
+            cost = sum([costFn(cell) for cell in cells[:-1]]) + costFn(state)
+            predecessors.append((prevState, reverse, cost))
+
+        # Bookkeeping for display purposes, as for the successors
+        self._expanded += 1 # DO NOT CHANGE
+        if self.visualize and state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
+    def getCostOfActions(self, actions):
+        if actions == None: return 999999
+        return self.problem.getCostOfActions(self.expandActions(actions))
+
+    def expandActions(actions):
+        "Flattens a path of corridor actions into single moves."
+        if actions == None: return None
+        return [action for corridor in actions for action in corridor]
+    expandActions = staticmethod(expandActions)
+
+class JunctionSearchAgent(SearchAgent):
+    """
+    A SearchAgent that searches the junction graph of the layout, so each
+    corridor costs one node expansion instead of one per cell.  It takes the
+    same arguments as SearchAgent, e.g.
+
+    python pacman.py -l bigMaze -p JunctionSearchAgent -a fn=astar,heuristic=manhattanHeuristic
+
+    Corridors have different lengths, so breadth first search here finds the
+    path through the fewest junctions; use ucs or astar for the shortest one.
+    """
+    def __init__(self, **args):
+        SearchAgent.__init__(self, **args)
+        problemType = self.searchType
+        self.searchType = lambda state: JunctionSearchProblem(problemType(state), state.getJunctionGraph())
+
+    def registerInitialState(self, state):
+        SearchAgent.registerInitialState(self, state)
+        self.actions = JunctionSearchProblem.expandActions(self.actions)
+
 class StayEastSearchAgent(SearchAgent):
     """
     An agent for position search with a cost function that penalizes being in
@@ -368,40 +534,110 @@ class AStarCornersAgent(SearchAgent):
         self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
         self.searchType = CornersProblem
 
+class FoodSearchState(object):
+    """
+    A FoodSearchProblem state, packed into two integers: the index of
+    Pacman's cell among the open cells of the maze, and a bitmask with bit i
+    set while the i-th dot of the starting food is still there.  Hashing and
+    comparing states only touch these integers.
+
+    For heuristics written against the old (pacmanPosition, foodGrid)
+    tuples, a state still unpacks and indexes like one; the food Grid is
+    only built when a state asks for it, and the problem keeps the most
+    recently used ones (FOOD_GRID_CACHE_SIZE) so states with the same food
+    share them.
+    """
+    __slots__ = ('cell', 'food', 'problem')
+
+    def __init__(self, cell, food, problem):
+        self.cell = cell
+        self.food = food
+        self.problem = problem
+
+    def getPosition(self):
+        return self.problem.positions[self.cell]
+
+    def getFoodGrid(self):
+        "Returns the remaining food as a Grid, which must not be modified"
+        return self.problem.foodGrid(self.food)
+
+    def __getitem__(self, i):
+        return (self.getPosition, self.getFoodGrid)[i]()
+
+    def __iter__(self):
+        return iter((self.getPosition(), self.getFoodGrid()))
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return isinstance(other, FoodSearchState) and self.cell == other.cell and self.food == other.food
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.cell, self.food))
+
+    def __repr__(self):
+        return 'FoodSearchState(%s, %s)' % (self.getPosition(), bin(self.food))
+
+FOOD_GRID_CACHE_SIZE = 1000     # Food Grids a FoodSearchProblem keeps for its states
+
 class FoodSearchProblem:
     """
     A search problem associated with finding the a path that collects all of the
     food (dots) in a Pacman game.
 
-    A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
+    A search state in this problem is a FoodSearchState, which unpacks like a
+    tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
       foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
     """
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
         self.walls = startingGameState.getWalls()
+        food = startingGameState.getFood()
+        self.positions = self.walls.asList(False)            # Cell index -> position
+        self.cellIndex = dict([(position, i) for i, position in enumerate(self.positions)])
+        self.foodPositions = food.asList()                  # Food bit -> position
+        foodBits = dict([(position, 1 << i) for i, position in enumerate(self.foodPositions)])
+        neighbors = startingGameState.getNeighborTable()
+        self.moves = []                                     # Cell index -> [(next cell, direction, food bit of next cell)]
+        for position in self.positions:
+            self.moves.append([(self.cellIndex[nextPosition], direction, foodBits.get(nextPosition, 0))
+                               for nextPosition, direction in neighbors[position]])
+        self.foodGrids = util.LRUCache(FOOD_GRID_CACHE_SIZE) # Food bitmask -> Grid, shared by states with that food
+        self.start = FoodSearchState(self.cellIndex[startingGameState.getPacmanPosition()], (1 << len(self.foodPositions)) - 1, self)
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
 
+    def foodGrid(self, food):
+        "Returns the Grid of the food left in the bitmask food"
+        grid = self.foodGrids.get(food)
+        if grid is None:
+            grid = BitGrid(self.walls.width, self.walls.height)
+            i = 0
+            while food >> i:
+                if (food >> i) & 1:
+                    x, y = self.foodPositions[i]
+                    grid.bits |= 1 << (x * grid.height + y)
+                i += 1
+            self.foodGrids.put(food, grid)
+        return grid
+
     def getStartState(self):
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state.food == 0
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        for nextCell, direction, foodBit in self.moves[state.cell]:
+            successors.append( ( FoodSearchState(nextCell, state.food & ~foodBit, self), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -509,8 +745,10 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.neighbors = gameState.getNeighborTable()
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
+        self.visualize = displayDrawsExpandedCells()
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
 
     def isGoalState(self, state):
@@ -525,18 +763,23 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points. The gameState can be any
+    game state -- Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
-    This might be a useful helper function for your ApproximateSearchAgent.
+    The distance is looked up in the layout's all-pairs distance table (see
+    layout.MazeDistances), which is built once per layout, so this is cheap
+    enough to call from heuristics and evaluation functions.
+
+    Two points with no path between them are float('inf') apart, so the
+    result can always be added and compared.
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    distance = gameState.getMazeDistances().getDistance(point1, point2)
+    if distance == None: return float('inf')
+    return distance
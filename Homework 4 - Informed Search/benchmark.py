@@ -0,0 +1,271 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs the search algorithms in search.py on the search problems in
+searchAgents.py over the layouts in layouts/, without graphics, and compares
+the nodes expanded and path cost of each run with a baseline file:
+
+> python benchmark.py                   Run everything and compare with the baseline
+> python benchmark.py --save            Run everything and make the results the baseline
+> python benchmark.py -l tinyMaze,bigMaze -a astar,ucs -p PositionSearchProblem
+
+Each run gets a fresh worker process and is stopped after --timeout
+seconds.  The exit status is 1 if any run got worse than the baseline by
+more than the tolerance.
+
+Expansions and costs are the same on every machine, so the committed
+baseline only holds those.  Wall time and memory, how far a run raised the
+worker's peak resident memory in kilobytes, depend on the machine: save
+them into a local baseline with --save --timing, then compare with
+--timing.  Runs that time out are only counted as regressions with
+--timing.
+"""
+
+import optparse
+import os
+import sys
+import json
+import itertools
+
+import util
+import search
+import searchAgents
+import layout
+import pacman
+
+# Problem -> the heuristic to search it with
+PROBLEMS = [('PositionSearchProblem', 'manhattanHeuristic'),
+            ('CornersProblem', 'cornersHeuristic'),
+            ('FoodSearchProblem', 'foodHeuristic'),
+            ('AnyFoodSearchProblem', 'nullHeuristic')]
+
+ALGORITHMS = ['dfs', 'bfs', 'ucs', 'astar', 'bibfs', 'biastar', 'jps', 'idastar', 'smastar', 'arastar']
+
+# These need a problem with a single goal state, problem.goal
+SINGLE_GOAL_ALGORITHMS = ['bibfs', 'biastar', 'jps']
+
+# Measurements compared with the baseline, and the ones that depend on the
+# machine, which are only saved and compared with --timing; small differences
+# in those are ignored as noise
+MEASUREMENTS = ['expanded', 'cost']
+TIMING_MEASUREMENTS = ['memory', 'wallTime']
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Benchmark the search algorithms against a baseline')
+    parser.add_option('-l', '--layouts', dest = 'layouts', default = None,
+                      help = 'comma separated layouts to run, default every layout in layouts/')
+    parser.add_option('-a', '--algorithms', dest = 'algorithms', default = ','.join(ALGORITHMS),
+                      help = 'comma separated search functions to run, default %default')
+    parser.add_option('-p', '--problems', dest = 'problems', default = ','.join([name for name, heuristic in PROBLEMS]),
+                      help = 'comma separated search problems to run, default %default')
+    parser.add_option('-b', '--baseline', dest = 'baseline', default = 'benchmark_baseline.json',
+                      help = 'the baseline file, default %default')
+    parser.add_option('--save', dest = 'save', action = 'store_true', default = False,
+                      help = 'write the results into the baseline file instead of comparing with it')
+    parser.add_option('--timing', dest = 'timing', action = 'store_true', default = False,
+                      help = 'also save or compare wall time and memory, and count timeouts as regressions')
+    parser.add_option('--tolerance', dest = 'tolerance', type = 'float', default = 0.05,
+                      help = 'fraction that expansions, path cost and memory may grow by, default %default')
+    parser.add_option('--time-tolerance', dest = 'timeTolerance', type = 'float', default = 1.0,
+                      help = 'fraction that wall time may grow by, default %default')
+    parser.add_option('--min-time', dest = 'minTime', type = 'float', default = 0.25,
+                      help = 'wall time differences below this many seconds are noise, default %default')
+    parser.add_option('--min-memory', dest = 'minMemory', type = 'int', default = 1024,
+                      help = 'memory differences below this many kilobytes are noise, default %default')
+    parser.add_option('-t', '--timeout', dest = 'timeout', type = 'int', default = 10,
+                      help = 'seconds each run may take, default %default')
+    parser.add_option('-m', '--max-memory', dest = 'maxMemory', type = 'int', default = 1024,
+                      help = 'megabytes each run may use, default %default')
+    parser.add_option('-w', '--workers', dest = 'workers', type = 'int', default = 2,
+                      help = 'runs to do at once, default %default')
+    (options, args) = parser.parse_args(argv)
+    if len(args) != 0:
+        raise Exception('Command line input not understood: ' + str(args))
+    return options
+
+def getCases(layouts, algorithms, problems):
+    "Returns the (layout, problem, heuristic, algorithm) runs to do"
+    heuristics = dict(PROBLEMS)
+    cases = []
+    for layoutName in layouts:
+        for problem in problems:
+            for algorithm in algorithms:
+                if algorithm in SINGLE_GOAL_ALGORITHMS and problem != 'PositionSearchProblem':
+                    continue
+                cases.append((layoutName, problem, heuristics[problem], algorithm))
+    return cases
+
+def caseKey(case):
+    layoutName, problem, heuristic, algorithm = case
+    return '%s/%s/%s' % (layoutName, problem, algorithm)
+
+def _initBenchmarkWorker(timeout, maxMemory):
+    "Sets the limits of a worker process"
+    try:
+        import resource
+        limit = maxMemory * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError):
+        pass
+    global _WORKER_TIMEOUT
+    _WORKER_TIMEOUT = timeout
+
+def runCase(case):
+    """
+    Runs one search and returns its results: the status ('ok', 'nopath',
+    'timeout', 'memory', 'nogoal' for a PositionSearchProblem whose goal is a
+    wall, or the error), and for a finished search its statistics and path
+    cost.
+    """
+    layoutName, problemName, heuristicName, algorithm = case
+    board = layout.getLayout(layoutName)
+    state = pacman.GameState()
+    state.initialize(board, board.getNumGhosts())
+
+    if problemName == 'PositionSearchProblem' and board.isWall((1, 1)):
+        return {'status': 'nogoal'}
+    heuristic = getattr(searchAgents, heuristicName, None) or getattr(search, heuristicName)
+    function = getattr(search, algorithm)
+    options = {}
+    if 'heuristic' in function.func_code.co_varnames: options['heuristic'] = heuristic
+
+    try:
+        import resource
+        memoryBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        memoryBefore = None
+
+    util.mutePrint()
+    try:
+        try:
+            if problemName == 'PositionSearchProblem':
+                problem = searchAgents.PositionSearchProblem(state, warn=False, visualize=False)
+            else:
+                problem = getattr(searchAgents, problemName)(state)
+            path = util.TimeoutFunction(search.instrumentedSearch, _WORKER_TIMEOUT)(function, problem, **options)
+        except util.TimeoutFunctionException:
+            return {'status': 'timeout'}
+        except MemoryError:
+            return {'status': 'memory'}
+        except Exception, e:
+            return {'status': '%s: %s' % (e.__class__.__name__, e)}
+    finally:
+        util.unmutePrint()
+
+    result = problem.searchStatistics.asDict()
+    result['status'] = 'ok'
+    if not path and not problem.isGoalState(problem.getStartState()):
+        result['status'] = 'nopath'
+    result['cost'] = problem.getCostOfActions(path)
+    result['memory'] = None
+    if memoryBefore != None: result['memory'] = result['peakMemory'] - memoryBefore
+    return result
+
+def runCases(cases, workers, timeout, maxMemory):
+    "Yields the result of each case, in order"
+    import multiprocessing
+    pool = multiprocessing.Pool(workers, _initBenchmarkWorker, (timeout, maxMemory), maxtasksperchild=1)
+    try:
+        for result in pool.imap(runCase, cases):
+            yield result
+    finally:
+        pool.terminate()
+
+def baselineEntry(result, options):
+    "Returns the part of a result that goes into the baseline"
+    measurements = ['status'] + MEASUREMENTS
+    if options.timing: measurements += TIMING_MEASUREMENTS
+    return dict([(measurement, result[measurement]) for measurement in measurements if measurement in result])
+
+def compare(key, result, base, options):
+    "Returns a description of each way result is worse than base"
+    if base['status'] != 'ok': return []
+    if result['status'] != 'ok':
+        if result['status'] == 'timeout':
+            if not options.timing: return []    # Depends on the machine
+            if base.get('wallTime', 0) > options.timeout / 2.0:
+                return []                       # It was already close to the limit
+        return ['%s: %s, was ok' % (key, result['status'])]
+    measurements = MEASUREMENTS
+    if options.timing: measurements = MEASUREMENTS + TIMING_MEASUREMENTS
+    regressions = []
+    for measurement in measurements:
+        old, new = base.get(measurement), result.get(measurement)
+        if old == None or new == None: continue
+        if measurement == 'wallTime':
+            if new - old > options.minTime and new > old * (1 + options.timeTolerance):
+                regressions.append('%s: wall time %.2fs, was %.2fs' % (key, new, old))
+        elif measurement == 'memory':
+            if new - old > options.minMemory and new > old * (1 + options.tolerance):
+                regressions.append('%s: memory %d KB, was %d KB' % (key, new, old))
+        elif new > old * (1 + options.tolerance):
+            regressions.append('%s: %s %s, was %s' % (key, measurement, new, old))
+    return regressions
+
+def printResult(key, result):
+    if result['status'] != 'ok':
+        print '%-60s %s' % (key, result['status'])
+    else:
+        print '%-60s cost %4d, %8d expanded, %7.2fs, %7s KB' % \
+            (key, result['cost'], result['expanded'], result['wallTime'], result['memory'])
+
+def runBenchmark(options):
+    if options.layouts == None:
+        layouts = sorted([name[:-4] for name in os.listdir('layouts') if name.endswith('.lay')])
+    else:
+        layouts = options.layouts.split(',')
+    cases = getCases(layouts, options.algorithms.split(','), options.problems.split(','))
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        f = open(options.baseline)
+        try: baseline = json.load(f)
+        finally: f.close()
+
+    results, regressions, timeouts = {}, [], 0
+    for case, result in itertools.izip(cases, runCases(cases, options.workers, options.timeout, options.maxMemory)):
+        key = caseKey(case)
+        results[key] = result
+        printResult(key, result)
+        if key in baseline and not options.save:
+            regressions.extend(compare(key, result, baseline[key], options))
+            if result['status'] == 'timeout' and baseline[key]['status'] == 'ok': timeouts += 1
+
+    if options.save:
+        for key, result in results.items():
+            baseline[key] = baselineEntry(result, options)
+        f = open(options.baseline, 'w')
+        try: json.dump(baseline, f, indent=1, sort_keys=True, separators=(',', ': '))
+        finally: f.close()
+        print 'Saved %d results to %s' % (len(results), options.baseline)
+        return 0
+
+    if not baseline:
+        print 'No baseline in %s; run with --save to make one' % options.baseline
+        return 0
+    print '%d runs, %d compared with %s' % (len(results), len([key for key in results if key in baseline]), options.baseline)
+    if timeouts and not options.timing:
+        print '%d runs that finished in the baseline timed out; use --timing to count them' % timeouts
+    if regressions:
+        print '%d regressions:' % len(regressions)
+        for regression in regressions:
+            print '  ' + regression
+        return 1
+    print 'No regressions'
+    return 0
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    sys.exit(runBenchmark(options))
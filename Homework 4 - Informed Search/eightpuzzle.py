@@ -14,10 +14,52 @@
 
 import search
 import random
+import os
+from array import array
 
 # Module Classes
 
-class EightPuzzleState:
+class PuzzleGeometry:
+    """
+    What every puzzle of one size shares: how its states are packed into an
+    integer, where the blank can move from each cell, and the goal.
+
+    A state keeps the number in each cell in a field of 'bits' bits, cell 0
+    in the lowest, so moving the blank only changes two fields.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.bits = len(bin(self.cells - 1)) - 2
+        self.mask = (1 << self.bits) - 1
+        self.goal = 0
+        for cell in range(self.cells):
+            self.goal |= cell << (self.bits * cell)
+
+        self.moves = []                     # Blank cell -> [(move, cell the blank moves to)]
+        self.targets = []                   # Blank cell -> {move: cell the blank moves to}
+        self.neighbors = []                 # Cell -> cells next to it
+        for cell in range(self.cells):
+            row, col = divmod(cell, size)
+            moves = []
+            if row != 0: moves.append(('up', cell - size))
+            if row != size - 1: moves.append(('down', cell + size))
+            if col != 0: moves.append(('left', cell - 1))
+            if col != size - 1: moves.append(('right', cell + 1))
+            self.moves.append(moves)
+            self.targets.append(dict(moves))
+            self.neighbors.append([target for move, target in moves])
+
+_GEOMETRIES = {}
+
+def getGeometry(size):
+    "Returns the PuzzleGeometry of size x size puzzles, built once"
+    if size not in _GEOMETRIES:
+        _GEOMETRIES[size] = PuzzleGeometry(size)
+    return _GEOMETRIES[size]
+
+class EightPuzzleState(object):
     """
     The Eight Puzzle is described in the course textbook on
     page 64.
@@ -25,7 +67,11 @@ class EightPuzzleState:
     This class defines the mechanics of the puzzle itself.  The
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
+
+    The same class handles any size x size puzzle, such as the 15-puzzle,
+    given that many numbers.
     """
+    __slots__ = ('geometry', 'board', 'blank')
 
     def __init__( self, numbers ):
         """
@@ -46,18 +92,35 @@ class EightPuzzleState:
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is packed into the integer 'board'
+        (see PuzzleGeometry), and 'blank' is the cell of the blank, so a
+        move or a hash is a few integer operations.
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        size = int(round(len(numbers) ** 0.5))
+        if size * size != len(numbers):
+            raise Exception('A puzzle needs a square number of cells, not %d' % len(numbers))
+        self.geometry = getGeometry(size)
+        self.board = 0
+        for cell, number in enumerate(numbers):
+            self.board |= number << (self.geometry.bits * cell)
+            if number == 0:
+                self.blank = cell
+
+    def getNumbers( self ):
+        "Returns the number in each cell, in row order"
+        return [self[cell] for cell in range(self.geometry.cells)]
+
+    def getCells( self ):
+        "Returns the numbers as a list of rows"
+        numbers, size = self.getNumbers(), self.geometry.size
+        return [numbers[row * size:(row + 1) * size] for row in range(size)]
+    cells = property(getCells)
+
+    def getBlankLocation( self ):
+        return divmod(self.blank, self.geometry.size)
+    blankLocation = property(getBlankLocation)
+
+    size = property(lambda self: self.geometry.size)
 
     def isGoal( self ):
         """
@@ -77,13 +140,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.board == self.geometry.goal
 
     def legalMoves( self ):
         """
@@ -95,17 +152,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, target in self.geometry.moves[self.blank]]
 
     def result(self, move):
         """
@@ -113,38 +160,31 @@ class EightPuzzleState:
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves will raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
+        target = self.geometry.targets[self.blank].get(move)
+        if target == None:
+            raise Exception('Illegal move: ' + str(move))
+        return self.moveBlank(target)
+
+    def moveBlank(self, target):
+        "Returns the puzzle with the blank swapped with the number in cell target"
+        bits = self.geometry.bits
+        number = (self.board >> (bits * target)) & self.geometry.mask
+        newPuzzle = EightPuzzleState.__new__(EightPuzzleState)
+        newPuzzle.geometry = self.geometry
+        newPuzzle.board = self.board - (number << (bits * target)) + (number << (bits * self.blank))
+        newPuzzle.blank = target
         return newPuzzle
 
+    def __getitem__(self, cell):
+        "Returns the number in cell, counting along the rows from 0"
+        if not 0 <= cell < self.geometry.cells: raise IndexError(cell)
+        return (self.board >> (self.geometry.bits * cell)) & self.geometry.mask
+
     # Utilities for comparison and display
     def __eq__(self, other):
         """
@@ -155,27 +195,28 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return isinstance(other, EightPuzzleState) and self.board == other.board
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.board)
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
+        width = len(str(self.geometry.cells - 1))
         lines = []
-        horizontalLine = ('-' * (13))
+        horizontalLine = ('-' * (self.geometry.size * (width + 3) + 1))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + str(col).rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -183,6 +224,249 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+class PatternDatabase:
+    """
+    An additive pattern database heuristic for size x size puzzles, for use
+    with aStarSearch:
+
+      search.aStarSearch(EightPuzzleSearchProblem(puzzle), PatternDatabase(3))
+
+    The numbered tiles are split into disjoint groups.  For each group a table
+    gives the fewest moves of that group's tiles that bring them home from
+    any placement, where a tile may move into any neighbouring cell not taken
+    by another tile of its group.  Every real move moves a single tile, so the
+    sum over the groups never overestimates and changes by at most one per
+    move, which makes it consistent.
+
+    The tables are built by breadth first search back from the goal the first
+    time they are needed and saved in directory, so later runs load them.
+    """
+    # The 15-puzzle's two tables of six numbers take a couple of minutes to
+    # build, but solve many times faster than three groups of five
+    GROUPS = {3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+              4: [(1, 2, 3), (4, 5, 8, 9, 12, 13), (6, 7, 10, 11, 14, 15)]}
+    UNSEEN = 255
+
+    def __init__(self, size=3, groups=None, directory=None):
+        self.geometry = getGeometry(size)
+        if groups == None: groups = PatternDatabase.GROUPS[size]
+        if directory == None: directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns')
+        self.groups = [tuple(tiles) for tiles in groups]
+        self.tables = [self.loadTable(tiles, directory) for tiles in self.groups]
+
+        # Number -> its group and what its cell is multiplied by in the index
+        self.groupOf = [None] * self.geometry.cells
+        self.multiplier = [0] * self.geometry.cells
+        for group, tiles in enumerate(self.groups):
+            for i, tile in enumerate(tiles):
+                self.groupOf[tile] = group
+                self.multiplier[tile] = self.geometry.cells ** i
+
+    def loadTable(self, tiles, directory):
+        "Returns the table of a group, from its file if there is one"
+        n = self.geometry.cells
+        path = os.path.join(directory, 'pdb-%dx%d-%s.bin' % (self.geometry.size, self.geometry.size, '-'.join(map(str, tiles))))
+        table = array('B')
+        if os.path.exists(path):
+            f = open(path, 'rb')
+            try: table.fromfile(f, n ** len(tiles))
+            finally: f.close()
+            return table
+        table = self.buildTable(tiles)
+        if not os.path.isdir(directory): os.makedirs(directory)
+        f = open(path + '.%d' % os.getpid(), 'wb')
+        try: table.tofile(f)
+        finally: f.close()
+        os.rename(path + '.%d' % os.getpid(), path)  # Other processes never see half a table
+        return table
+
+    def buildTable(self, tiles):
+        """
+        Returns the table of the group: the entry for the placement with tile
+        tiles[i] in cell p[i] is at index p[0] + p[1] * n + p[2] * n**2 + ...
+        for n cells, and placements that are never reached are UNSEEN.
+        """
+        n, k = self.geometry.cells, len(tiles)
+        powers = [n ** i for i in range(k)]
+        table = array('B', [PatternDatabase.UNSEEN]) * (n ** k)
+        goal = sum([tile * power for tile, power in zip(tiles, powers)])
+        table[goal] = 0
+        frontier, depth = [goal], 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for index in frontier:
+                positions, rest = [], index
+                for i in range(k):
+                    rest, position = divmod(rest, n)
+                    positions.append(position)
+                for i, position in enumerate(positions):
+                    for target in self.geometry.neighbors[position]:
+                        if target in positions: continue
+                        nextIndex = index + (target - position) * powers[i]
+                        if table[nextIndex] == PatternDatabase.UNSEEN:
+                            table[nextIndex] = depth
+                            nextFrontier.append(nextIndex)
+            frontier = nextFrontier
+        return table
+
+    def getIndexes(self, numbers):
+        "Returns the index into each group's table of the puzzle with these numbers"
+        indexes = [0] * len(self.groups)
+        for cell, number in enumerate(numbers):
+            if self.groupOf[number] != None:
+                indexes[self.groupOf[number]] += cell * self.multiplier[number]
+        return indexes
+
+    def __call__(self, state, problem=None):
+        total = 0
+        for index, table in zip(self.getIndexes(state.getNumbers()), self.tables):
+            total += table[index]
+        return total
+
+def isSolvable(puzzle):
+    """
+      Returns whether the puzzle can reach the goal.
+
+    Every move swaps the blank with a number, which flips the parity of the
+    permutation of the cells, and moves the blank one step, which flips the
+    parity of its distance from its goal cell.  Both start equal at the goal,
+    so only puzzles where they are equal can be solved.
+
+    >>> isSolvable(EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]))
+    True
+    >>> isSolvable(EightPuzzleState([0, 2, 1, 3, 4, 5, 6, 7, 8]))
+    False
+    """
+    numbers = puzzle.getNumbers()
+    swaps, seen = 0, [False] * len(numbers)
+    for cell in range(len(numbers)):        # A cycle of length k is k - 1 swaps
+        length = 0
+        while not seen[cell]:
+            seen[cell] = True
+            cell = numbers[cell]
+            length += 1
+        if length: swaps += length - 1
+    row, col = puzzle.blankLocation
+    return swaps % 2 == (row + col) % 2
+
+class PuzzleSolver:
+    """
+    Solves size x size puzzles optimally with IDA* and a PatternDatabase,
+    much faster than running search.py on an EightPuzzleSearchProblem: the
+    puzzle is one list changed in place, a move changes the index into just
+    one group's table, and the heuristic is updated rather than recomputed.
+
+    The goal is symmetric about the diagonal, so the database is also looked
+    up for the puzzle's mirror image, its transpose with each number n
+    renamed to the number at the transpose of n's goal cell, which solves in
+    as many moves.  The heuristic is the larger of the two.
+
+      PuzzleSolver(PatternDatabase(4)).solve(createRandomPuzzle(4))
+    """
+    FOUND = -1
+
+    def __init__(self, database):
+        self.database = database
+        self.geometry = database.geometry
+        self.expanded = 0
+
+        size, cells = self.geometry.size, self.geometry.cells
+        self.transpose = [(cell % size) * size + cell // size for cell in range(cells)]
+        # Number -> the group and multiplier of its mirror image
+        self.mirrorGroupOf = [database.groupOf[self.transpose[number]] for number in range(cells)]
+        self.mirrorMultiplier = [database.multiplier[self.transpose[number]] for number in range(cells)]
+
+    def getMirrorNumbers(self, numbers):
+        "Returns the numbers of the mirror image of the puzzle"
+        mirror = [0] * len(numbers)
+        for cell, number in enumerate(numbers):
+            mirror[self.transpose[cell]] = self.transpose[number]
+        return mirror
+
+    def solve(self, puzzle):
+        "Returns the fewest moves that solve the puzzle"
+        if puzzle.geometry is not self.geometry:
+            raise Exception('The solver is for %dx%d puzzles' % (self.geometry.size, self.geometry.size))
+        if not isSolvable(puzzle):
+            raise Exception('The puzzle cannot be solved:\n' + str(puzzle))
+
+        numbers = puzzle.getNumbers()
+        indexes = self.database.getIndexes(numbers)
+        mirrorIndexes = self.database.getIndexes(self.getMirrorNumbers(numbers))
+        tables, groupOf, multiplier = self.database.tables, self.database.groupOf, self.database.multiplier
+        mirrorGroupOf, mirrorMultiplier, transpose = self.mirrorGroupOf, self.mirrorMultiplier, self.transpose
+        moves, FOUND = self.geometry.moves, PuzzleSolver.FOUND
+        path = []
+
+        def depthFirst(blank, cost, h, mirrorH, bound, previous):
+            "Returns FOUND with the moves in path, or the least f-cost over bound"
+            self.expanded += 1
+            least = float('inf')
+            for move, target in moves[blank]:
+                if target == previous: continue             # Undoing the last move never helps
+                number = numbers[target]
+                group, mirrorGroup = groupOf[number], mirrorGroupOf[number]
+                index, mirrorIndex = indexes[group], mirrorIndexes[mirrorGroup]
+                childIndex = index + (blank - target) * multiplier[number]
+                childMirrorIndex = mirrorIndex + (transpose[blank] - transpose[target]) * mirrorMultiplier[number]
+                table, mirrorTable = tables[group], tables[mirrorGroup]
+                childH = h - table[index] + table[childIndex]
+                childMirrorH = mirrorH - mirrorTable[mirrorIndex] + mirrorTable[childMirrorIndex]
+                f = cost + 1 + max(childH, childMirrorH)
+                if f > bound:
+                    if f < least: least = f
+                    continue
+                path.append(move)
+                if childH == 0: return FOUND                # Only the goal has every group home
+                numbers[blank], numbers[target] = number, 0
+                indexes[group], mirrorIndexes[mirrorGroup] = childIndex, childMirrorIndex
+                result = depthFirst(target, cost + 1, childH, childMirrorH, bound, blank)
+                if result == FOUND: return FOUND
+                numbers[blank], numbers[target] = 0, number
+                indexes[group], mirrorIndexes[mirrorGroup] = index, mirrorIndex
+                path.pop()
+                if result < least: least = result
+            return least
+
+        h = mirrorH = 0
+        for index, mirrorIndex, table in zip(indexes, mirrorIndexes, tables):
+            h += table[index]
+            mirrorH += table[mirrorIndex]
+        bound = max(h, mirrorH)
+        while h != 0:
+            bound = depthFirst(puzzle.blank, 0, h, mirrorH, bound, None)
+            if bound == FOUND: break
+        return path
+
+_BATCH_SOLVER = None
+
+def _initBatchWorker(size, groups):
+    global _BATCH_SOLVER
+    _BATCH_SOLVER = PuzzleSolver(PatternDatabase(size, groups))
+
+def _solveBatchPuzzle(numbers):
+    import time
+    start, expanded = time.time(), _BATCH_SOLVER.expanded
+    path = _BATCH_SOLVER.solve(EightPuzzleState(numbers))
+    return path, _BATCH_SOLVER.expanded - expanded, time.time() - start
+
+def solveBatch(puzzles, workers=2, groups=None):
+    """
+      Solves puzzles of one size in workers processes, yielding
+    (moves, nodes expanded, seconds) for each puzzle in order.
+    """
+    import multiprocessing
+    if not puzzles: return
+    size = puzzles[0].size
+    PatternDatabase(size, groups)           # Built once here, then loaded by each worker
+    pool = multiprocessing.Pool(workers, _initBatchWorker, (size, groups))
+    try:
+        for result in pool.imap(_solveBatchPuzzle, [puzzle.getNumbers() for puzzle in puzzles]):
+            yield result
+    finally:
+        pool.terminate()
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
@@ -196,7 +480,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -207,10 +491,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
-        succ = []
-        for a in state.legalMoves():
-            succ.append((state.result(a), a, 1))
-        return succ
+        return [(state.moveBlank(target), move, 1) for move, target in state.geometry.moves[state.blank]]
 
     def getCostOfActions(self, actions):
         """
@@ -248,28 +529,98 @@ def loadEightPuzzle(puzzleNumber):
     """
     return EightPuzzleState(EIGHT_PUZZLE_DATA[puzzleNumber])
 
-def createRandomEightPuzzle(moves=100):
+def createRandomEightPuzzle(moves=100, size=3):
     """
       moves: number of random moves to apply
+      size: the number of rows and columns, 4 for the 15-puzzle
 
       Creates a random eight puzzle by applying
       a series of 'moves' random moves to a solved
       puzzle.
     """
-    puzzle = EightPuzzleState([0,1,2,3,4,5,6,7,8])
+    puzzle = EightPuzzleState(range(size * size))
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+def createRandomPuzzle(size=4):
+    """
+      Returns a size x size puzzle drawn evenly from every puzzle that
+    can be solved.
+    """
+    numbers = range(size * size)
+    random.shuffle(numbers)
+    puzzle = EightPuzzleState(numbers)
+    if not isSolvable(puzzle):              # Swapping two numbers flips the parity
+        first, second = [cell for cell in range(size * size) if numbers[cell] != 0][:2]
+        numbers[first], numbers[second] = numbers[second], numbers[first]
+        puzzle = EightPuzzleState(numbers)
+    return puzzle
+
+def readPuzzles(filename):
+    "Reads one puzzle per line, as its numbers in row order"
+    f = open(filename)
+    try:
+        return [EightPuzzleState(map(int, line.replace(',', ' ').split())) for line in f if line.strip()]
+    finally:
+        f.close()
+
+def runBatch(argv):
+    """
+    Solves many puzzles optimally, in parallel:
+
+    > python eightpuzzle.py -s 4 -n 20 -w 4     20 random 15-puzzles in 4 processes
+    > python eightpuzzle.py -f puzzles.txt      The puzzles in a file, one per line
+    """
+    import optparse, time
+    parser = optparse.OptionParser(usage = runBatch.__doc__)
+    parser.add_option('-s', '--size', dest = 'size', type = 'int', default = 4,
+                      help = 'the number of rows and columns of the random puzzles, default %default')
+    parser.add_option('-n', '--number', dest = 'number', type = 'int', default = 10,
+                      help = 'how many random puzzles to solve, default %default')
+    parser.add_option('-f', '--file', dest = 'file', default = None,
+                      help = 'solve the puzzles in this file instead of random ones')
+    parser.add_option('-w', '--workers', dest = 'workers', type = 'int', default = 2,
+                      help = 'puzzles to solve at once, default %default')
+    parser.add_option('-r', '--seed', dest = 'seed', type = 'int', default = None,
+                      help = 'the seed of the random puzzles')
+    (options, args) = parser.parse_args(argv)
+    if len(args) != 0:
+        raise Exception('Command line input not understood: ' + str(args))
+
+    if options.file != None:
+        puzzles = readPuzzles(options.file)
+    else:
+        random.seed(options.seed)
+        puzzles = [createRandomPuzzle(options.size) for i in range(options.number)]
+    for puzzle in puzzles:
+        if not isSolvable(puzzle):
+            raise Exception('The puzzle cannot be solved:\n' + str(puzzle))
+
+    start = time.time()
+    for i, (path, expanded, seconds) in enumerate(solveBatch(puzzles, options.workers)):
+        print('%3d: %s' % (i, ' '.join(map(str, puzzles[i].getNumbers()))))
+        print('     %d moves, %d expanded, %.2fs' % (len(path), expanded, seconds))
+    print('Solved %d puzzles in %.2fs' % (len(puzzles), time.time() - start))
+
 if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        runBatch(sys.argv[1:])
+        sys.exit(0)
+
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
     print(puzzle)
 
     problem = EightPuzzleSearchProblem(puzzle)
-    path = search.breadthFirstSearch(problem)
-    print('BFS found a path of %d moves: %s' % (len(path), str(path)))
+    if 'aStarSearch' in dir(search):
+        path = search.aStarSearch(problem, PatternDatabase(puzzle.size))
+        print('A* with a pattern database found a path of %d moves: %s' % (len(path), str(path)))
+    else:
+        path = search.breadthFirstSearch(problem)
+        print('BFS found a path of %d moves: %s' % (len(path), str(path)))
     curr = puzzle
     i = 1
     for a in path:
@@ -72,34 +72,180 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def graphSearch(problem, frontier):
+class SearchNode(object):
+    """
+    A node in the search tree.  Rather than carrying a full copy of the path
+    that reached it, each node keeps a pointer to its parent and the single
+    action taken from there, so pushing a successor is O(1) regardless of
+    how deep it is.  The action list is only rebuilt by getPath() once a goal
+    has been found.
+
+    state  - the search state of this node
+    action - the action taken from the parent to reach this node
+    cost   - the total path cost from the start state to this node
+    parent - the parent SearchNode, or None for the successors of the start
+    """
+    __slots__ = ('state', 'action', 'cost', 'parent')
+
+    def __init__(self, state, action, cost, parent=None):
+        self.state = state
+        self.action = action
+        self.cost = cost
+        self.parent = parent
+
+    def getPath(self):
+        "Returns the list of actions leading from the start state to this node"
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
+class SearchStatistics:
+    """
+    What one search call did:
+
+    algorithm      - the name of the search function
+    expanded       - nodes expanded, i.e. calls to getSuccessors (or
+                     getPredecessors, for the backward half of a search)
+    generated      - the successors those calls returned
+    frontierPeak   - the most nodes on the frontier at once
+    closedPeak     - the most states in the closed set at once, or in
+                     whatever table of reached states the search keeps
+    heuristicCalls - calls to the heuristic
+    heuristicTime  - seconds spent in the heuristic
+    wallTime       - seconds the whole search took
+    peakMemory     - the peak resident memory of the process after the
+                     search, in kilobytes on Linux, or None where the
+                     resource module is missing
+
+    Every search function calls record() once per expansion to keep the two
+    peaks; the rest are filled in by instrumentedSearch.
+    """
+    FIELDS = ['algorithm', 'expanded', 'generated', 'frontierPeak', 'closedPeak',
+              'heuristicCalls', 'heuristicTime', 'wallTime', 'peakMemory']
+
+    def __init__(self, algorithm=None):
+        self.algorithm = algorithm
+        self.expanded, self.generated = 0, 0
+        self.frontierPeak, self.closedPeak = 0, 0
+        self.heuristicCalls, self.heuristicTime = 0, 0.0
+        self.wallTime, self.peakMemory = 0.0, None
+
+    def record(self, frontierSize, closedSize):
+        if frontierSize > self.frontierPeak: self.frontierPeak = frontierSize
+        if closedSize > self.closedPeak: self.closedPeak = closedSize
+
+    def asDict(self):
+        return dict([(field, getattr(self, field)) for field in SearchStatistics.FIELDS])
+
+    def toJson(self):
+        import json
+        return json.dumps(self.asDict(), sort_keys=True)
+
+def getStatistics(problem):
+    """
+    Returns the SearchStatistics that instrumentedSearch is filling in for
+    problem, or a throwaway one when the search is not being instrumented.
+    """
+    return getattr(problem, 'searchStatistics', None) or SearchStatistics()
+
+def instrumentedSearch(searchFunction, problem, heuristic=None, **options):
+    """
+    Runs searchFunction on problem, passing heuristic if one is given and any
+    other options, and returns its path.  The SearchStatistics of the run are
+    left in problem.searchStatistics.
+
+    Expansions are counted by wrapping the problem's getSuccessors and
+    getPredecessors for the length of the search (a call made from inside
+    the other counts once), and the heuristic by wrapping it.
+    """
+    import time
+    stats = SearchStatistics(searchFunction.__name__)
+    problem.searchStatistics = stats
+
+    depth = [0]                             # Nesting of the wrapped methods, so only the outermost call counts
+    def counted(method):
+        def call(state):
+            depth[0] += 1
+            try:
+                successors = method(state)
+            finally:
+                depth[0] -= 1
+            if depth[0] == 0:
+                stats.expanded += 1
+                stats.generated += len(successors)
+            return successors
+        return call
+    names = [name for name in ['getSuccessors', 'getPredecessors'] if hasattr(problem, name)]
+    saved = dict([(name, problem.__dict__[name]) for name in names if name in problem.__dict__])
+    for name in names:
+        setattr(problem, name, counted(getattr(problem, name)))
+
+    if heuristic is not None:
+        def timedHeuristic(state, problem):
+            begin = time.time()
+            value = heuristic(state, problem)
+            stats.heuristicTime += time.time() - begin
+            stats.heuristicCalls += 1
+            return value
+        options['heuristic'] = timedHeuristic
+
+    begin = time.time()
+    try:
+        return searchFunction(problem, **options)
+    finally:
+        stats.wallTime = time.time() - begin
+        for name in names:
+            if name in saved: setattr(problem, name, saved[name])
+            else: delattr(problem, name)
+        try:
+            import resource
+            stats.peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+
+def graphSearch(problem, frontier, costPruning=False):
     """
     Once your DFS, BFS, UCS, and A* algorithms work, unify them
     into a single, iterative graphSearch algorithm that
     requires only an object to manage the fringe.
+
+    With costPruning set, a successor is only pushed if it is not closed and
+    is cheaper than the best path cost found to it so far.  Paired with an
+    IndexedPriorityQueueWithFunction keyed on node.state this keeps a single
+    frontier entry per state for UCS and A*, while expanding states in the
+    same order as the unpruned search.
     """
     "*** YOUR CODE HERE ***"
+    stats = getStatistics(problem)                                  # Keeps the frontier and closed list peaks
     closed = set()                                                  # Create the closed list
+    bestCost = {}                                                   # Cheapest known path cost to each generated state (costPruning only)
     closed.add(problem.getStartState()[0])                          # Add the first node because we "skip" it
     for succ in problem.getSuccessors(problem.getStartState()):     # For each succesor node
-        frontier.push((succ, []))                                   # Add it to the frontier along with an empty list to track the path and a path cost
+        if costPruning:                                             # If pruning, skip pushes that are no cheaper than a known path
+            if succ[0] in bestCost and bestCost[succ[0]] <= succ[2]:
+                continue
+            bestCost[succ[0]] = succ[2]
+        frontier.push(SearchNode(succ[0], succ[1], succ[2]))        # Add it to the frontier as a node with no parent
     while True:                                                     # While true
         if frontier.isEmpty():                                      # If frontier is empty
             return []                                               # Return empty list representing no path
         node = frontier.pop()                                       # Get one of the nodes from the frontier
-        if problem.isGoalState(node[0][0]):                         # If the node is the goal state
-            node[1].append(node[0][1])                              # Add that nodes direction to the list of directions
-            return node[1]                                          # Return the list of directions
-        if node[0][0] not in closed:                                # If the current node is not in the closed list
-            closed.add(node[0][0])                                  # Add the nodes coordinates to the closed list
-            for succ in problem.getSuccessors(node[0][0]):          # Get the successor states for the current node, for each successor
-                frontier.push(((succ[0], succ[1], succ[2] + node[0][2]), node[1] + [node[0][1]]))   # Add it to the frontier and add it to the paths history list
-
-    # node[0] = current state
-    # node[0][0] = current position
-    # node[0][1] = current direction
-    # node[0][2] = current total path cost
-    # node[1] = directions of current path
+        if problem.isGoalState(node.state):                         # If the node is the goal state
+            return node.getPath()                                   # Walk the parent pointers back to get the list of directions
+        if node.state not in closed:                                # If the current node is not in the closed list
+            closed.add(node.state)                                  # Add the nodes coordinates to the closed list
+            for succ in problem.getSuccessors(node.state):          # Get the successor states for the current node, for each successor
+                cost = succ[2] + node.cost                          # Total path cost of reaching the successor through this node
+                if costPruning:                                     # If pruning, skip closed states and pushes no cheaper than a known path
+                    if succ[0] in closed or (succ[0] in bestCost and bestCost[succ[0]] <= cost):
+                        continue
+                    bestCost[succ[0]] = cost
+                frontier.push(SearchNode(succ[0], succ[1], cost, node))   # Add it to the frontier pointing back at the current node
+            stats.record(len(frontier), len(closed))
 
 def depthFirstSearch(problem):
     """
@@ -127,9 +273,10 @@ def uniformCostSearch(problem):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
     def priFunction(item):
-        return item[0][2]
+        return item.cost
 
-    return graphSearch(problem,util.PriorityQueueWithFunction(priFunction))
+    frontier = util.IndexedPriorityQueueWithFunction(priFunction, lambda node: node.state)
+    return graphSearch(problem, frontier, costPruning=True)
 
 def nullHeuristic(state, problem=None):
     """
@@ -142,10 +289,489 @@ def aStarSearch(problem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
     "*** YOUR CODE HERE ***"
     def priFunction(node):
-        score = node[0][2] + heuristic(node[0][0], problem)
+        score = node.cost + heuristic(node.state, problem)
         return score
 
-    return graphSearch(problem,util.PriorityQueueWithFunction(priFunction))
+    frontier = util.IndexedPriorityQueueWithFunction(priFunction, lambda node: node.state)
+    return graphSearch(problem, frontier, costPruning=True)
+
+def getPredecessors(problem, state):
+    """
+    Returns (predecessor, action, stepCost) triples for the moves that lead
+    into state, using problem.getPredecessors if the problem has one and
+    otherwise assuming every move in getSuccessors can be undone at the same
+    cost.
+    """
+    if hasattr(problem, 'getPredecessors'):
+        return problem.getPredecessors(state)
+    from game import Actions
+    return [(succ, Actions.reverseDirection(action), cost) for succ, action, cost in problem.getSuccessors(state)]
+
+def bidirectionalPath(forwardNode, backwardNode):
+    """
+    Joins the forward path from the start to a meeting state with the
+    backward path from there to the goal.  Either node is None when the
+    meeting state is the start or the goal itself; a backward node's action
+    leads from its state to its parent's.
+    """
+    path = []
+    if forwardNode is not None: path = forwardNode.getPath()
+    while backwardNode is not None:
+        path.append(backwardNode.action)
+        backwardNode = backwardNode.parent
+    return path
+
+def bidirectionalBreadthFirstSearch(problem):
+    """
+    Search outward from both the start and problem.goal, one whole level
+    at a time on the side with the smaller level, until the two searches
+    meet.  The problem must have a single goal state, problem.goal, and moves
+    that can be reversed (see getPredecessors).  Returns a path with the
+    fewest actions, as breadthFirstSearch does.
+    """
+    start, goal = problem.getStartState(), problem.goal
+    if problem.isGoalState(start): return []
+    nodes = ({start: None}, {goal: None})   # State -> SearchNode, from each end
+    depths = ({start: 0}, {goal: 0})        # State -> number of actions from each end
+    levels = [[start], [goal]]              # The deepest level of each search
+    stats = getStatistics(problem)
+    while levels[0] and levels[1]:
+        side = int(len(levels[1]) < len(levels[0]))     # Grow the smaller level
+        other = 1 - side
+        nextLevel = []
+        meeting, bestLength = None, None
+        for state in levels[side]:
+            if side == 0: neighbours = problem.getSuccessors(state)
+            else: neighbours = getPredecessors(problem, state)
+            for succ, action, cost in neighbours:
+                if succ in nodes[side]:
+                    continue
+                parent = nodes[side][state]
+                if parent is not None: cost += parent.cost
+                nodes[side][succ] = SearchNode(succ, action, cost, parent)
+                depths[side][succ] = depths[side][state] + 1
+                nextLevel.append(succ)
+                if succ in nodes[other]:                # The searches meet; keep the shortest joined path of this level
+                    length = depths[side][succ] + depths[other][succ]
+                    if bestLength is None or length < bestLength:
+                        meeting, bestLength = succ, length
+        stats.record(len(nextLevel) + len(levels[other]), len(nodes[0]) + len(nodes[1]))
+        if meeting is not None:
+            problem.isGoalState(goal)                   # Lets the display draw the expanded cells
+            return bidirectionalPath(nodes[0][meeting], nodes[1][meeting])
+        levels[side] = nextLevel
+    return []
+
+def bidirectionalAStarSearch(problem, heuristic=nullHeuristic):
+    """
+    A* from both the start and problem.goal at once, with the same
+    requirements as bidirectionalBreadthFirstSearch.  heuristic(state,
+    problem) estimates the cost to problem.goal, and is also called with a
+    copy of the problem whose goal is the start to estimate the cost back.
+
+    Both searches order their frontiers by the average of the two estimates,
+    (h to goal - h to start) / 2, added to or taken from the path cost, which
+    keeps the search consistent when the heuristic is.  The searches stop
+    once the two smallest priorities add up to at least the cheapest joined
+    path found, so the path returned is as cheap as aStarSearch's.
+    """
+    import copy
+    start, goal = problem.getStartState(), problem.goal
+    if problem.isGoalState(start): return []
+    reverse = copy.copy(problem)
+    reverse.goal = start
+    def potential(state):
+        return (heuristic(state, problem) - heuristic(state, reverse)) / 2.0
+
+    nodes = ({start: None}, {goal: None})   # State -> SearchNode, from each end
+    costs = ({start: 0}, {goal: 0})         # State -> cheapest known path cost from each end
+    closed = (set(), set())
+    frontiers = (util.IndexedPriorityQueue(), util.IndexedPriorityQueue())
+    stats = getStatistics(problem)
+    frontiers[0].push(start, potential(start))
+    frontiers[1].push(goal, -potential(goal))
+    meeting, bestCost = None, float('inf')
+    while not frontiers[0].isEmpty() and not frontiers[1].isEmpty():
+        if frontiers[0].peekPriority() + frontiers[1].peekPriority() >= bestCost:
+            break
+        side = int(len(frontiers[1]) < len(frontiers[0]))   # Expand from the smaller frontier
+        other, sign = 1 - side, 1 - 2 * side
+        state = frontiers[side].pop()
+        closed[side].add(state)
+        if side == 0: neighbours = problem.getSuccessors(state)
+        else: neighbours = getPredecessors(problem, state)
+        for succ, action, stepCost in neighbours:
+            if succ in closed[side]:
+                continue
+            cost = costs[side][state] + stepCost
+            if succ not in costs[side] or cost < costs[side][succ]:
+                costs[side][succ] = cost
+                nodes[side][succ] = SearchNode(succ, action, cost, nodes[side][state])
+                frontiers[side].update(succ, cost + sign * potential(succ))
+            if succ in costs[other] and costs[side][succ] + costs[other][succ] < bestCost:
+                meeting, bestCost = succ, costs[side][succ] + costs[other][succ]
+        stats.record(len(frontiers[0]) + len(frontiers[1]), len(closed[0]) + len(closed[1]))
+    if meeting is None: return []
+    problem.isGoalState(goal)                   # Lets the display draw the expanded cells
+    return bidirectionalPath(nodes[0][meeting], nodes[1][meeting])
+
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    IDA*: a depth-first search that gives up on any node whose cost plus
+    heuristic is over a bound, starting with the bound at the start state's
+    heuristic and raising it to the smallest value that went over, until the
+    goal is found.  With an admissible heuristic the path is optimal.
+
+    Only the current path is kept, plus a table of the cheapest cost each
+    state was reached at during the current iteration, so a state reached
+    again at no lower cost is not searched twice.  The table stops growing
+    at maxNodes states, which bounds the memory used.
+    """
+    maxNodes = int(maxNodes)
+    stats = getStatistics(problem)
+    start = problem.getStartState()
+    bound = heuristic(start, problem)
+    while True:
+        nextBound = float('inf')
+        reached = {start: 0}                # State -> cheapest cost reached at in this iteration
+        onPath = set([start])
+        stack = [[SearchNode(start, None, 0), None]]    # [node, iterator over its successors]
+        while stack:
+            entry = stack[-1]
+            node = entry[0]
+            if entry[1] is None:                        # First visit
+                f = node.cost + heuristic(node.state, problem)
+                if f > bound:
+                    nextBound = min(nextBound, f)
+                    stack.pop()
+                    onPath.discard(node.state)
+                    continue
+                if problem.isGoalState(node.state):
+                    return node.getPath()[1:]
+                entry[1] = iter(problem.getSuccessors(node.state))
+                stats.record(len(stack), len(reached))
+            succ = next(entry[1], None)
+            if succ is None:                            # Every successor has been searched
+                stack.pop()
+                onPath.discard(node.state)
+                continue
+            state, action, cost = succ
+            cost += node.cost
+            if state in onPath or reached.get(state, cost + 1) <= cost:
+                continue
+            if state in reached or len(reached) < maxNodes:
+                reached[state] = cost
+            onPath.add(state)
+            stack.append([SearchNode(state, action, cost, node), None])
+        if nextBound == float('inf'):
+            return []
+        bound = nextBound
+
+class MemoryBoundedNode(SearchNode):
+    """
+    A SearchNode for smaStarSearch, which also keeps
+
+    f          - the node's f-cost, raised to the least f-cost of its
+                 successors once all of them have been generated
+    depth      - the number of actions from the start state
+    index      - which of its parent's successors this node is
+    successors - the problem's successors of state, or None if not expanded
+    generated  - how many of those successors have been generated so far
+    children   - the successor nodes currently in memory
+    forgotten  - successor index -> f-cost, for the successors dropped from
+                 memory
+    """
+    __slots__ = ('f', 'depth', 'index', 'successors', 'generated', 'children', 'forgotten')
+
+    def __init__(self, state, action, cost, parent, f, index=None):
+        SearchNode.__init__(self, state, action, cost, parent)
+        self.f = f
+        self.depth = 0
+        if parent is not None: self.depth = parent.depth + 1
+        self.index = index
+        self.successors = None
+        self.generated = 0
+        self.children = []
+        self.forgotten = {}
+
+def smaStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    SMA*: A* that never holds more than maxNodes nodes.  Successors are
+    generated one at a time, and when memory is full the shallowest of the
+    leaves with the highest f-cost is dropped.  Its parent remembers the
+    dropped node's f-cost and regenerates it once everything else looks
+    worse.  Once all of a node's successors have been generated, its f-cost
+    is raised to their least f-cost, so the work below it is not lost when
+    they are dropped.
+
+    With an admissible heuristic the path is optimal if the optimal path
+    fits in memory, i.e. has fewer than maxNodes actions.  Paths that go
+    back to a state already on them are not searched, and neither is a
+    successor whose state is in memory at no higher cost: the node in
+    memory, or the f-cost its parent remembers for it, stands for both.
+    """
+    maxNodes = max(2, int(maxNodes))
+    start = problem.getStartState()
+    root = MemoryBoundedNode(start, None, 0, None, heuristic(start, problem))
+    frontier = util.IndexedPriorityQueue()  # Nodes with successors not in memory, least f and deepest first
+    leaves = util.IndexedPriorityQueue()    # Nodes other than the root with no children, worst first
+    frontier.push(root, (root.f, 0))
+    stored = 1
+    stats = getStatistics(problem)
+    inMemory = {start: root}                # State -> cheapest node in memory with that state
+
+    def onPath(node, state):
+        while node is not None:
+            if node.state == state: return True
+            node = node.parent
+        return False
+
+    def reprioritize(node):
+        if node in frontier:
+            frontier.remove(node)
+            frontier.push(node, (node.f, -node.depth))
+        if node in leaves:
+            leaves.remove(node)
+            leaves.push(node, (-node.f, node.depth))
+
+    def backUp(node):
+        "Raises the f-costs of node and its ancestors to the least f-cost of their successors"
+        while node is not None and node.successors is not None and node.generated == len(node.successors):
+            f = min([child.f for child in node.children] + node.forgotten.values() + [float('inf')])
+            if f <= node.f: return
+            node.f = f
+            reprioritize(node)
+            node = node.parent
+
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        if node.f == float('inf'):
+            return []
+        if problem.isGoalState(node.state):
+            return node.getPath()[1:]
+        if node.successors is None:
+            node.successors = [succ for succ in problem.getSuccessors(node.state) if not onPath(node, succ[0])]
+            stats.record(len(frontier), len(inMemory))
+        if node.generated < len(node.successors):
+            index = node.generated
+            node.generated += 1
+            f = None
+        elif node.forgotten:
+            index = min(node.forgotten, key=node.forgotten.get)
+            f = node.forgotten.pop(index)
+        else:                                   # A dead end
+            node.f = float('inf')
+            if node is not root: leaves.update(node, (-node.f, node.depth))
+            backUp(node.parent)
+            continue
+        state, action, cost = node.successors[index]
+        cost += node.cost
+        if state in inMemory and inMemory[state].cost <= cost:
+            if node.generated < len(node.successors) or node.forgotten:
+                frontier.push(node, (node.f, -node.depth))
+            backUp(node)
+            continue
+        if f is None:
+            f = max(node.f, cost + heuristic(state, problem))
+            if node.depth + 2 >= maxNodes and not problem.isGoalState(state):
+                f = float('inf')                # A longer path could not fit in memory
+        child = MemoryBoundedNode(state, action, cost, node, f, index)
+        inMemory[state] = child
+        if node in leaves: leaves.remove(node)
+        node.children.append(child)
+        stored += 1
+        if node.generated < len(node.successors) or node.forgotten:
+            frontier.push(node, (node.f, -node.depth))
+        backUp(node)
+        frontier.push(child, (child.f, -child.depth))
+        leaves.push(child, (-child.f, child.depth))
+
+        if stored > maxNodes:                   # Drop the worst leaf
+            leaf = leaves.pop()
+            if leaf in frontier: frontier.remove(leaf)
+            parent = leaf.parent
+            parent.children.remove(leaf)
+            if inMemory.get(leaf.state) is leaf: del inMemory[leaf.state]
+            parent.forgotten[leaf.index] = leaf.f
+            stored -= 1
+            if parent not in frontier:
+                frontier.push(parent, (parent.f, -parent.depth))
+            if not parent.children and parent is not root:
+                leaves.push(parent, (-parent.f, parent.depth))
+    return []
+
+def anytimeRepairingAStarSearch(problem, heuristic=nullHeuristic, weight=3.0, weightStep=0.5, timeLimit=None):
+    """
+    ARA*: finds a first path quickly with weighted A*, ordering the frontier
+    by cost + weight * heuristic, then lowers the weight by weightStep and
+    repairs the search for a cheaper path, until the weight reaches 1 or
+    timeLimit seconds have passed.  The first path is always found, however
+    long it takes; after that the best path found when time runs out is
+    returned.
+
+    Each repair reuses the costs found so far: only states whose cost went
+    down since they were expanded are put back on the frontier.  After every
+    path found, problem.suboptimalityBound is set to how many times the
+    optimal cost the path could at most be (1.0 once it is known to be
+    optimal), given an admissible heuristic.
+    """
+    import time
+    weight, weightStep = float(weight), float(weightStep)
+    deadline = None
+    if timeLimit is not None: deadline = time.time() + float(timeLimit)
+
+    start = problem.getStartState()
+    nodes = {start: SearchNode(start, None, 0)}     # State -> node for the cheapest path found to it
+    estimates = {}                                  # State -> heuristic, so each is only computed once
+    def h(state):
+        if state not in estimates: estimates[state] = heuristic(state, problem)
+        return estimates[state]
+
+    frontier = util.IndexedPriorityQueue()
+    frontier.push(start, weight * h(start))
+    closed = set()
+    stats = getStatistics(problem)
+    inconsistent = set()                            # Closed states whose cost went down since they were expanded
+    best = [None]                                   # Node of the best goal found so far
+    if problem.isGoalState(start): best[0] = nodes[start]
+
+    def improvePath():
+        "Expands states until the best goal is no worse than the frontier, or time runs out"
+        while not frontier.isEmpty():
+            if best[0] is not None:
+                if best[0].cost <= frontier.peekPriority(): return
+                if deadline is not None and time.time() > deadline: return
+            state = frontier.pop()
+            closed.add(state)
+            node = nodes[state]
+            for succ, action, stepCost in problem.getSuccessors(state):
+                cost = node.cost + stepCost
+                if succ in nodes and nodes[succ].cost <= cost:
+                    continue
+                nodes[succ] = SearchNode(succ, action, cost, node)
+                if problem.isGoalState(succ) and (best[0] is None or cost < best[0].cost):
+                    best[0] = nodes[succ]
+                if succ in closed:
+                    inconsistent.add(succ)
+                else:
+                    frontier.update(succ, cost + weight * h(succ))
+            stats.record(len(frontier), len(closed))
+
+    def bound():
+        "How many times the optimal cost the best path could be"
+        lowest = min([nodes[state].cost + h(state) for state in list(frontier.entries) + list(inconsistent)] + [best[0].cost])
+        if lowest <= 0: return weight
+        return min(weight, best[0].cost / float(lowest))
+
+    improvePath()
+    if best[0] is None: return []
+    problem.suboptimalityBound = bound()
+    while problem.suboptimalityBound > 1 and (deadline is None or time.time() < deadline):
+        weight = max(1.0, weight - weightStep)
+        states = list(frontier.entries) + list(inconsistent)
+        frontier = util.IndexedPriorityQueue()
+        for state in states:
+            frontier.push(state, nodes[state].cost + weight * h(state))
+        inconsistent.clear()
+        closed.clear()
+        improvePath()
+        problem.suboptimalityBound = bound()
+    return best[0].getPath()[1:]
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    A* over the jump points of a grid problem with unit-cost moves in the
+    four directions, such as a PositionSearchProblem with the default costFn.
+    The problem must have walls, costFn and a single goal; any other
+    problem, or one whose costFn is not the same everywhere, is searched by
+    aStarSearch instead.
+
+    From each point the search runs in a straight line until it reaches the
+    goal or a jump point.  Running horizontally, a jump point is a cell with
+    an open side that was walled off on the cell before it, since a
+    shortest path may have to turn there.  Running vertically, it is a cell
+    from which a horizontal run finds a jump point.  Every other move is
+    left out, since a shortest path can always turn vertically as early as
+    it can, so only the jump points are expanded (and counted in
+    problem._expanded).  The path between them is then unrolled into single
+    moves.
+    """
+    from game import Actions
+    walls = getattr(problem, 'walls', None)
+    costFn = getattr(problem, 'costFn', None)
+    goal = getattr(problem, 'goal', None)
+    if walls is None or costFn is None or goal is None:
+        return aStarSearch(problem, heuristic)
+    cells = walls.asList(False)
+    stepCost = costFn(goal)
+    for cell in cells:
+        if costFn(cell) != stepCost:
+            return aStarSearch(problem, heuristic)
+
+    start = problem.getStartState()
+    if problem.isGoalState(start): return []
+
+    def blocked(x, y):
+        return x < 0 or y < 0 or x >= walls.width or y >= walls.height or walls[x][y]
+
+    def forced(x, y, dx):
+        "Whether a horizontal run in direction dx has to stop at (x, y)"
+        return (not blocked(x, y + 1) and blocked(x - dx, y + 1)) or \
+               (not blocked(x, y - 1) and blocked(x - dx, y - 1))
+
+    def jump(x, y, dx, dy):
+        "Runs from (x, y) in direction (dx, dy) and returns the jump point reached, or None"
+        while True:
+            x, y = x + dx, y + dy
+            if blocked(x, y): return None
+            if (x, y) == goal: return (x, y)
+            if dy == 0:
+                if forced(x, y, dx): return (x, y)
+            elif jump(x, y, 1, 0) != None or jump(x, y, -1, 0) != None:
+                return (x, y)
+
+    def directions(node):
+        "The directions worth running in from node, given the one it was reached in"
+        if node.action == None: return [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        dx, dy = [int(d) for d in Actions.directionToVector(node.action)]
+        if dy == 0:
+            x, y = node.state
+            return [(dx, 0)] + [(0, vy) for vy in (1, -1) if not blocked(x, y + vy) and blocked(x - dx, y + vy)]
+        return [(0, dy), (1, 0), (-1, 0)]
+
+    frontier = util.IndexedPriorityQueueWithFunction(lambda node: node.cost + heuristic(node.state, problem),
+                                                     lambda node: node.state)
+    frontier.push(SearchNode(start, None, 0))
+    closed = set()
+    stats = getStatistics(problem)
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        if node.state == goal:
+            break
+        closed.add(node.state)
+        problem._expanded += 1
+        if getattr(problem, 'visualize', True): problem._visitedlist.append(node.state)
+        x, y = node.state
+        for dx, dy in directions(node):
+            point = jump(x, y, dx, dy)
+            if point == None or point in closed: continue
+            steps = abs(point[0] - x) + abs(point[1] - y)
+            frontier.push(SearchNode(point, Actions.vectorToDirection((dx, dy)), node.cost + steps * stepCost, node))
+            stats.generated += 1
+        stats.expanded += 1                     # Jump points are expanded without getSuccessors
+        stats.record(len(frontier), len(closed))
+    else:
+        return []
+
+    problem.isGoalState(goal)                   # Lets the display draw the expanded cells
+    path = []
+    while node.parent != None:                  # Unroll each run into single moves, from the goal back
+        steps = abs(node.state[0] - node.parent.state[0]) + abs(node.state[1] - node.parent.state[1])
+        path.extend([node.action] * steps)
+        node = node.parent
+    path.reverse()
+    return path
 
 
 # Abbreviations
@@ -153,3 +779,9 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 ucs = uniformCostSearch
 astar = aStarSearch
+bibfs = bidirectionalBreadthFirstSearch
+biastar = bidirectionalAStarSearch
+jps = jumpPointSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = smaStarSearch
+arastar = anytimeRepairingAStarSearch
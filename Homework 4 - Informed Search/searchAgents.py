@@ -37,9 +37,13 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
 import util
 import time
 import search
+import layout
+import json
+import itertools
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -68,12 +72,28 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
-
-
-    Note: You should NOT change any code in SearchAgent
+      bidirectionalBreadthFirstSearch or bibfs
+      bidirectionalAStarSearch or biastar
+      jumpPointSearch or jps
+      iterativeDeepeningAStarSearch or idastar
+      smaStarSearch or smastar
+      anytimeRepairingAStarSearch or arastar
+
+    Any other agent arguments are passed on to the search function, e.g.
+    -a fn=smastar,prob=FoodSearchProblem,heuristic=foodHeuristic,maxNodes=50000
+    or, to stop improving the path after 2 seconds of startup time,
+    -a fn=arastar,prob=FoodSearchProblem,heuristic=foodHeuristic,timeLimit=2
+
+    The SearchStatistics of the search (see search.py) are kept in
+    self.statistics as a dict, along with the problem, heuristic and path
+    cost.  With statsFile they are also appended to that file as a line of
+    JSON, or printed if it is '-'.
+
+    Note: search functions, problems and heuristics are looked up by name,
+    so new ones in search.py or this file need no change to SearchAgent.
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', statsFile=None, **searchOptions):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -82,7 +102,7 @@ class SearchAgent(Agent):
         func = getattr(search, fn)
         if 'heuristic' not in func.func_code.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: search.instrumentedSearch(func, x, **searchOptions)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -92,13 +112,15 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: search.instrumentedSearch(func, x, heuristic=heur, **searchOptions)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
             raise AttributeError, prob + ' is not a search problem type in SearchAgents.py.'
         self.searchType = globals()[prob]
         print('[SearchAgent] using problem type ' + prob)
+        self.description = {'function': fn, 'problem': prob, 'heuristic': heuristic}
+        self.statsFile = statsFile
 
     def registerInitialState(self, state):
         """
@@ -116,6 +138,23 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        self.statistics = None
+        if 'searchStatistics' in dir(problem): self.recordStatistics(problem.searchStatistics, totalCost)
+        if 'suboptimalityBound' in dir(problem): print('Path cost is at most %.2f times the optimal' % problem.suboptimalityBound)
+
+    def recordStatistics(self, stats, totalCost):
+        "Keeps the statistics of the search in self.statistics and writes them to statsFile"
+        self.statistics = stats.asDict()
+        self.statistics.update(self.description)
+        self.statistics['cost'] = totalCost
+        if self.statsFile == None: return
+        line = json.dumps(self.statistics, sort_keys=True)
+        if self.statsFile == '-':
+            print(line)
+        else:
+            f = open(self.statsFile, 'a')
+            try: f.write(line + '\n')
+            finally: f.close()
 
     def getAction(self, state):
         """
@@ -133,6 +172,15 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+def displayDrawsExpandedCells():
+    """
+    Returns whether the running display can draw the cells a search has
+    expanded.  Under NullGraphics, the text display or the autograder it
+    cannot, so the search problems only count their expansions.
+    """
+    import __main__
+    return 'drawExpandedCells' in dir(getattr(__main__, '_display', None))
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -151,13 +199,16 @@ class PositionSearchProblem(search.SearchProblem):
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        visualize: Whether to record the expanded cells for the display to
+                   draw; this is turned off when the display cannot draw them
         """
         self.walls = gameState.getWalls()
+        self.neighbors = gameState.getNeighborTable()
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
         self.costFn = costFn
-        self.visualize = visualize
+        self.visualize = visualize and displayDrawsExpandedCells()
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
@@ -192,24 +243,30 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        costFn = self.costFn
+        neighbors = self.neighbors.get(state)
+        if neighbors == None:           # Not an open cell, such as a start given on a wall
+            neighbors = layout.cellNeighbors(self.walls, state)
+        successors = [(nextState, action, costFn(nextState)) for nextState, action in neighbors]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
+        if self.visualize and state not in self._visited:
             self._visited[state] = True
             self._visitedlist.append(state)
 
         return successors
 
+    def getPredecessors(self, state):
+        """
+        Returns the moves into state as (predecessor, action, stepCost)
+        triples, for searches that work back from the goal.  Every move is
+        reversible, so these are the successors with their actions reversed
+        and the cost of entering state.
+        """
+        cost = self.costFn(state)
+        return [(succ, Actions.reverseDirection(action), cost) for succ, action, stepCost in self.getSuccessors(state)]
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -226,6 +283,127 @@ class PositionSearchProblem(search.SearchProblem):
             cost += self.costFn((x,y))
         return cost
 
+class JunctionSearchProblem(search.SearchProblem):
+    """
+    Runs a position search over the junction graph of the layout (see
+    layout.py) instead of over single cells.
+
+    The states are junctions, plus the start and any goal cells so that the
+    search can begin and end inside a corridor.  Each action is the tuple of
+    Directions that walks one corridor; expandActions turns a path of these
+    back into ordinary moves.  Anything else, such as the goal a heuristic
+    looks at, is read from the wrapped problem.
+    """
+
+    def __init__(self, problem, graph):
+        self.problem = problem
+        self.graph = graph
+        corridorCells = set([cell for cell in graph.neighbors if cell not in graph.junctions])
+        goal = getattr(problem, 'goal', None)
+        if goal != None:                # isGoalState would also draw the goal on the display
+            goals = [goal]
+        else:                           # Problems with many goals, like AnyFoodSearchProblem
+            goals = [cell for cell in corridorCells if problem.isGoalState(cell)]
+        self.stops = set([problem.getStartState()] + [cell for cell in goals if cell in corridorCells])
+
+        # Corridor edges with a stop inside them are walked again up to it
+        self.brokenEdges = set()
+        for cell in self.stops:
+            self.brokenEdges.update(graph.corridorEdges.get(cell, []))
+
+        # For display purposes
+        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+
+    def __getattr__(self, name):
+        if name == 'problem': raise AttributeError, name
+        return getattr(self.problem, name)
+
+    def getStartState(self):
+        return self.problem.getStartState()
+
+    def isGoalState(self, state):
+        return self.problem.isGoalState(state)
+
+    def corridors(self, state):
+        "Returns the (next state, actions, cells entered) edges out of state."
+        if state in self.graph.edges:
+            edges = []
+            for i, edge in enumerate(self.graph.edges[state]):
+                if (state, i) in self.brokenEdges:
+                    edge = self.graph.corridor(state, edge[1][0], self.stops)
+                edges.append(edge)
+            return edges
+        return [self.graph.corridor(state, action, self.stops) for nextCell, action in self.graph.neighbors[state]]
+
+    def getSuccessors(self, state):
+        """
+        Returns (successor, actions, stepCost) triples where actions is the
+        tuple of moves along the corridor and stepCost is the cost of every
+        cell it enters.
+        """
+        costFn = self.problem.costFn
+        successors = [(nextState, actions, sum([costFn(cell) for cell in cells]))
+                      for nextState, actions, cells in self.corridors(state)]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if self.visualize and state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return successors
+
+    def getPredecessors(self, state):
+        """
+        Returns the corridors into state, found by walking each corridor out
+        of it and reversing the moves.  The cost is that of the cells entered
+        on the way back, which ends with state itself.
+        """
+        costFn = self.problem.costFn
+        predecessors = []
+        for prevState, actions, cells in self.corridors(state):
+            reverse = tuple([Actions.reverseDirection(action) for action in reversed(actions)])
+            cost = sum([costFn(cell) for cell in cells[:-1]]) + costFn(state)
+            predecessors.append((prevState, reverse, cost))
+
+        # Bookkeeping for display purposes, as for the successors
+        self._expanded += 1 # DO NOT CHANGE
+        if self.visualize and state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
+    def getCostOfActions(self, actions):
+        if actions == None: return 999999
+        return self.problem.getCostOfActions(self.expandActions(actions))
+
+    def expandActions(actions):
+        "Flattens a path of corridor actions into single moves."
+        if actions == None: return None
+        return [action for corridor in actions for action in corridor]
+    expandActions = staticmethod(expandActions)
+
+class JunctionSearchAgent(SearchAgent):
+    """
+    A SearchAgent that searches the junction graph of the layout, so each
+    corridor costs one node expansion instead of one per cell.  It takes the
+    same arguments as SearchAgent, e.g.
+
+    python pacman.py -l bigMaze -p JunctionSearchAgent -a fn=astar,heuristic=manhattanHeuristic
+
+    Corridors have different lengths, so breadth first search here finds the
+    path through the fewest junctions; use ucs or astar for the shortest one.
+    """
+    def __init__(self, **args):
+        SearchAgent.__init__(self, **args)
+        problemType = self.searchType
+        self.searchType = lambda state: JunctionSearchProblem(problemType(state), state.getJunctionGraph())
+
+    def registerInitialState(self, state):
+        SearchAgent.registerInitialState(self, state)
+        self.actions = JunctionSearchProblem.expandActions(self.actions)
+
 class StayEastSearchAgent(SearchAgent):
     """
     An agent for position search with a cost function that penalizes being in
@@ -288,8 +466,46 @@ class CornersProblem(search.SearchProblem):
         # Please add any code here which you would like to use
         # in initializing the problem
         "*** YOUR CODE HERE ***"
-        self.goalsCoord = [(1,1), (1,top), (right, 1), (right, top)]
-        self.goals = [False, False, False, False,]
+        # A state is (position, visited) where bit i of visited is set once
+        # corner i has been reached
+        self.allVisited = (1 << len(self.corners)) - 1
+        self.cornerBits = dict([(corner, 1 << i) for i, corner in enumerate(self.corners)])
+
+        # Legal moves from every open cell, in the order they are tried
+        self.moves = {}                                             # Position -> [(next position, action, corner bit of next position)]
+        for position, neighbors in startingGameState.getNeighborTable().items():
+            self.moves[position] = [(nextPosition, action, self.cornerBits.get(nextPosition, 0))
+                                    for nextPosition, action in neighbors]
+
+        # Maze distance from each corner to every open cell, infinite when
+        # the corner is a wall or cannot be reached
+        table = startingGameState.getMazeDistances()
+        self.cornerDistances = []
+        for corner in self.corners:
+            distances = dict([(cell, float('inf')) for cell in self.moves])
+            if corner in self.moves:
+                for cell in self.moves:
+                    distance = table.getDistance(corner, cell)
+                    if distance != None: distances[cell] = distance
+            self.cornerDistances.append(distances)
+        reachable = [distances[self.startingPosition] != float('inf') for distances in self.cornerDistances]
+
+        # tours[visited][i]: the shortest walk that starts at unvisited corner
+        # i and then reaches every other unvisited corner, over all orderings;
+        # infinite while an unvisited corner cannot be reached
+        self.tours = []
+        for visited in range(self.allVisited + 1):
+            left = [i for i in range(len(self.corners)) if not visited & (1 << i)]
+            tours = {}
+            if [i for i in left if not reachable[i]]:
+                tours = dict([(i, float('inf')) for i in left])
+                left = []
+            for order in itertools.permutations(left):
+                if not order: continue
+                length = sum([self.cornerDistances[a][self.corners[b]] for a, b in zip(order, order[1:])])
+                if order[0] not in tours or length < tours[order[0]]:
+                    tours[order[0]] = length
+            self.tours.append(tours)
 
     def getStartState(self):
         """
@@ -297,14 +513,14 @@ class CornersProblem(search.SearchProblem):
         space)
         """
         "*** YOUR CODE HERE ***"
-        return (self.startingPosition, self.goals[0], self.goals[1], self.goals[2], self.goals[3])
+        return (self.startingPosition, self.cornerBits.get(self.startingPosition, 0))
 
     def isGoalState(self, state):
         """
         Returns whether this search state is a goal state of the problem.
         """
         "*** YOUR CODE HERE ***"
-        return state[1] and state[2] and state[3] and state[4]
+        return state[1] == self.allVisited
 
 
     def getSuccessors(self, state):
@@ -318,29 +534,9 @@ class CornersProblem(search.SearchProblem):
             is the incremental cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            #   x,y = currentPosition
-            #   dx, dy = Actions.directionToVector(action)
-            #   nextx, nexty = int(x + dx), int(y + dy)
-            #   hitsWall = self.walls[nextx][nexty]
-            "*** YOUR CODE HERE ***"
-            sw, nw, se, ne = state[1], state[2], state[3], state[4]
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if (nextx, nexty) == self.goalsCoord[0]:
-                sw = True
-            if (nextx, nexty) == self.goalsCoord[1]:
-                nw = True
-            if (nextx, nexty) == self.goalsCoord[2]:
-                se = True
-            if (nextx, nexty) == self.goalsCoord[3]:
-                ne = True
-            if self.walls[nextx][nexty] != True:
-                successors.append((((nextx, nexty),sw, nw, se, ne), action, 1))
+        "*** YOUR CODE HERE ***"
+        position, visited = state
+        successors = [((nextPosition, visited | cornerBit), action, 1) for nextPosition, action, cornerBit in self.moves[position]]
         self._expanded += 1 # DO NOT CHANGE
         return successors
 
@@ -374,28 +570,13 @@ def cornersHeuristic(state, problem):
     walls = problem.walls # These are the walls of the maze, as a Grid (game.py)
 
     "*** YOUR CODE HERE ***"
-    heuristic = 0                                   # Return value
-    cornerStatus = []                               # List of all corners visited or not
-
-    for i, corner in enumerate (state[1:]):         # Fills cornerStatus from the state
-        cornerStatus.append((corners[i], corner))   # (Coordinated, visited?)
-
-    unvisited = []                                  # List to keep track of unvisited corners
-    for corner in cornerStatus:                     # For each corner
-        if corner[1] == False:                      # If it has not been visited
-            unvisited.append(corner)                # Add it to the list of unvisited corners
-
-    current = (state[0], False)                     # Set current to the current state coordinates, false is a placeholder
-    while unvisited:                                # While there are unvisited (unckecked) corners
-        distances = []                              # List that will hold distance from node being checked to all other unvisited corners
-        for corner in unvisited:                    # For each corner in the unvisited list
-            distances.append((corner, util.manhattanDistance(current[0], corner[0])))   # Add the coordinates and distance from the current node to all other unvisited nodes
-        corner, distance = min(distances, key = lambda t: t[1])                         # Find the closest unvisited corner based on current node
-        heuristic += distance                                                           # Add the distance to the heuristic return
-        current = corner                                                                # Now check all other unvisited nodes the same way but from this corner
-        unvisited.remove(corner)                                                        # Remove this corner from the list of unvisited corners
-
-    return heuristic                                # Return the final heuristic
+    # The exact remaining cost: the best over every order of the unvisited
+    # corners, looked up from the tables built by the problem
+    position, visited = state
+    tours = problem.tours[visited]
+    if not tours:
+        return 0
+    return min([problem.cornerDistances[i][position] + tours[i] for i in tours])
 
 
 class AStarCornersAgent(SearchAgent):
@@ -404,40 +585,110 @@ class AStarCornersAgent(SearchAgent):
         self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
         self.searchType = CornersProblem
 
+class FoodSearchState(object):
+    """
+    A FoodSearchProblem state, packed into two integers: the index of
+    Pacman's cell among the open cells of the maze, and a bitmask with bit i
+    set while the i-th dot of the starting food is still there.  Hashing and
+    comparing states only touch these integers.
+
+    For heuristics written against the old (pacmanPosition, foodGrid)
+    tuples, a state still unpacks and indexes like one; the food Grid is
+    only built when a state asks for it, and the problem keeps the most
+    recently used ones (FOOD_GRID_CACHE_SIZE) so states with the same food
+    share them.
+    """
+    __slots__ = ('cell', 'food', 'problem')
+
+    def __init__(self, cell, food, problem):
+        self.cell = cell
+        self.food = food
+        self.problem = problem
+
+    def getPosition(self):
+        return self.problem.positions[self.cell]
+
+    def getFoodGrid(self):
+        "Returns the remaining food as a Grid, which must not be modified"
+        return self.problem.foodGrid(self.food)
+
+    def __getitem__(self, i):
+        return (self.getPosition, self.getFoodGrid)[i]()
+
+    def __iter__(self):
+        return iter((self.getPosition(), self.getFoodGrid()))
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return isinstance(other, FoodSearchState) and self.cell == other.cell and self.food == other.food
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.cell, self.food))
+
+    def __repr__(self):
+        return 'FoodSearchState(%s, %s)' % (self.getPosition(), bin(self.food))
+
+FOOD_GRID_CACHE_SIZE = 1000     # Food Grids a FoodSearchProblem keeps for its states
+
 class FoodSearchProblem:
     """
     A search problem associated with finding the a path that collects all of the
     food (dots) in a Pacman game.
 
-    A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
+    A search state in this problem is a FoodSearchState, which unpacks like a
+    tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
       foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
     """
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
         self.walls = startingGameState.getWalls()
+        food = startingGameState.getFood()
+        self.positions = self.walls.asList(False)            # Cell index -> position
+        self.cellIndex = dict([(position, i) for i, position in enumerate(self.positions)])
+        self.foodPositions = food.asList()                  # Food bit -> position
+        foodBits = dict([(position, 1 << i) for i, position in enumerate(self.foodPositions)])
+        neighbors = startingGameState.getNeighborTable()
+        self.moves = []                                     # Cell index -> [(next cell, direction, food bit of next cell)]
+        for position in self.positions:
+            self.moves.append([(self.cellIndex[nextPosition], direction, foodBits.get(nextPosition, 0))
+                               for nextPosition, direction in neighbors[position]])
+        self.foodGrids = util.LRUCache(FOOD_GRID_CACHE_SIZE) # Food bitmask -> Grid, shared by states with that food
+        self.start = FoodSearchState(self.cellIndex[startingGameState.getPacmanPosition()], (1 << len(self.foodPositions)) - 1, self)
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
 
+    def foodGrid(self, food):
+        "Returns the Grid of the food left in the bitmask food"
+        grid = self.foodGrids.get(food)
+        if grid is None:
+            grid = BitGrid(self.walls.width, self.walls.height)
+            i = 0
+            while food >> i:
+                if (food >> i) & 1:
+                    x, y = self.foodPositions[i]
+                    grid.bits |= 1 << (x * grid.height + y)
+                i += 1
+            self.foodGrids.put(food, grid)
+        return grid
+
     def getStartState(self):
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state.food == 0
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        for nextCell, direction, foodBit in self.moves[state.cell]:
+            successors.append( ( FoodSearchState(nextCell, state.food & ~foodBit, self), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -488,41 +739,158 @@ def foodHeuristic(state, problem):
     Subsequent calls to this heuristic can access
     problem.heuristicInfo['wallCount']
     """
-    position, foodGrid = state
     "*** YOUR CODE HERE ***"
-    h1, h2, h3 = 0, 0, 0
-    foodList = foodGrid.asList()
-    if len(foodList) == 0:
+    food = state.food
+    if food == 0:                                               # No food left, so this is a goal
         return 0
-    furthest = ((foodList[0], util.manhattanDistance(position, foodList[0])))
-    closest = ((foodList[0], util.manhattanDistance(position, foodList[0])))
-    for food in foodList[1:]:
-        dist = util.manhattanDistance(position, food)
-        if closest[1] > dist:
-            closest = ((food, dist))
-        if furthest[1] < dist:
-            furthest = ((food, dist))
-
-    h1 = closest[1]
-    h2 = len(foodGrid.asList())
-    h3 = furthest[1]
+    info = problem.heuristicInfo
+    if 'foodDistances' not in info:                             # Look up the maze distances from each dot once
+        table = problem.startingGameState.getMazeDistances()
+        info['foodDistances'] = [[unreachableAsInfinite(table.getDistance(dot, position)) for position in problem.positions]
+                                 for dot in problem.foodPositions]
+        info['mstCache'] = util.LRUCache(MST_CACHE_SIZE)
+    distances = info['foodDistances']                           # Dot index -> cell index -> maze distance
+
+    dots = []                                                   # Indices of the dots left
+    while food:
+        lowest = food & -food
+        dots.append(lowest.bit_length() - 1)
+        food ^= lowest
+    nearest = min([distances[dot][state.cell] for dot in dots])  # Pacman has to reach some dot first
+
+    mst = info['mstCache'].get(state.food)                      # Then at least every edge of a spanning tree of the dots
+    if mst is None:
+        mst = foodSpanningTreeWeight(dots, distances, problem)
+        info['mstCache'].put(state.food, mst)
+    return nearest + mst
+
+MST_CACHE_SIZE = 100000     # Food subsets whose spanning tree weight foodHeuristic remembers
+
+def unreachableAsInfinite(distance):
+    "Returns a maze distance, or infinity for the None of a pair with no path"
+    if distance == None: return float('inf')
+    return distance
+
+def foodSpanningTreeWeight(dots, distances, problem):
+    """
+    Returns the total maze distance along a minimum spanning tree of the
+    given dots, found with Prim's algorithm.  A path through every dot is
+    itself a spanning tree of them, so it is at least this long.
+    """
+    cells = [problem.cellIndex[problem.foodPositions[dot]] for dot in dots]
+    best = [distances[dots[0]][cell] for cell in cells]        # Distance from the tree to each dot
+    inTree = [False] * len(dots)
+    inTree[0] = True
+    weight = 0
+    for step in range(len(dots) - 1):
+        nextDot = min([i for i in range(len(dots)) if not inTree[i]], key=best.__getitem__)
+        inTree[nextDot] = True
+        weight += best[nextDot]
+        row = distances[dots[nextDot]]
+        for i in range(len(dots)):
+            if not inTree[i] and row[cells[i]] < best[i]:
+                best[i] = row[cells[i]]
+    return weight
+
+
+class FoodDistanceField:
+    """
+    The maze distance from every open cell to its nearest remaining dot,
+    computed by one breadth first search seeded from all of the dots at once.
 
-    return max(h1, h2,h3)
+    Eating a dot only invalidates the cells that were nearest to it, so those
+    are repaired from their still valid neighbours instead of searching the
+    whole maze again.
+    """
 
+    def __init__(self, gameState):
+        self.neighbors = gameState.getNeighborTable()               # Position -> ((next position, action), ...), in the order bfs tries them
+
+        self.distance = {}                                          # Position -> distance to the nearest dot
+        self.source = {}                                            # Position -> the dot that distance was measured from
+        self.region = {}                                            # Dot -> set of positions whose nearest dot it is
+        frontier = util.Queue()
+        for dot in gameState.getFood().asList():
+            self.distance[dot], self.source[dot], self.region[dot] = 0, dot, set([dot])
+            frontier.push(dot)
+        while not frontier.isEmpty():
+            position = frontier.pop()
+            for nextPosition, action in self.neighbors[position]:
+                if nextPosition not in self.distance:
+                    self.label(nextPosition, self.distance[position] + 1, self.source[position])
+                    frontier.push(nextPosition)
+
+    def label(self, position, distance, dot):
+        self.distance[position], self.source[position] = distance, dot
+        self.region[dot].add(position)
+
+    def eat(self, dot):
+        """
+        Removes dot from the field and repairs the distances it invalidated.
+        """
+        stale = self.region.pop(dot, None)
+        if stale is None: return
+        for position in stale:
+            del self.distance[position], self.source[position]
+
+        # Cells next to the stale region still know a valid distance, and
+        # distances only grow, so a uniform cost search from them is exact
+        frontier = util.PriorityQueue()
+        for position in stale:
+            for nextPosition, action in self.neighbors[position]:
+                if nextPosition in self.distance:
+                    frontier.push(nextPosition, self.distance[nextPosition])
+        while not frontier.isEmpty():
+            position = frontier.pop()
+            for nextPosition, action in self.neighbors[position]:
+                if nextPosition in stale and self.distance.get(nextPosition, None) is None:
+                    self.label(nextPosition, self.distance[position] + 1, self.source[position])
+                    frontier.push(nextPosition, self.distance[nextPosition])
+
+    def pathToClosestDot(self, position):
+        """
+        Follows the field downhill from position. Taking the first action that
+        gets closer at every step gives the same path breadth first search
+        would find with AnyFoodSearchProblem.
+        """
+        actions = []
+        while self.distance[position] > 0:
+            for nextPosition, action in self.neighbors[position]:
+                if self.distance.get(nextPosition, None) == self.distance[position] - 1:
+                    break
+            actions.append(action)
+            position = nextPosition
+        return actions, position
 
 class ClosestDotSearchAgent(SearchAgent):
-    "Search for all food using a sequence of searches"
+    """
+    Search for all food using a sequence of searches
+
+    All of the closest dot paths are read off a single FoodDistanceField. Pass
+    -a validate=True to also replay every segment with findPathToClosestDot
+    and generateSuccessor and check it against the field.
+    """
+    def __init__(self, validate=False, **args):
+        SearchAgent.__init__(self, **args)
+        self.validate = str(validate).lower() in ['true', '1']
+
     def registerInitialState(self, state):
         self.actions = []
+        field = FoodDistanceField(state)
+        position = state.getPacmanPosition()
         currentState = state
-        while(currentState.getFood().count() > 0):
-            nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
+        for count in range(state.getNumFood()):
+            nextPathSegment, position = field.pathToClosestDot(position)
+            field.eat(position)
             self.actions += nextPathSegment
+            if not self.validate: continue
+            if len(nextPathSegment) != len(self.findPathToClosestDot(currentState)):
+                raise Exception, 'The distance field disagrees with findPathToClosestDot!\n%s' % str(currentState)
             for action in nextPathSegment:
                 legal = currentState.getLegalActions()
                 if action not in legal:
                     t = (str(action), str(currentState))
-                    raise Exception, 'findPathToClosestDot returned an illegal move: %s!\n%s' % t
+                    raise Exception, 'The distance field returned an illegal move: %s!\n%s' % t
                 currentState = currentState.generateSuccessor(0, action)
         self.actionIndex = 0
         print 'Path found with cost %d.' % len(self.actions)
@@ -564,8 +932,10 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.neighbors = gameState.getNeighborTable()
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
+        self.visualize = displayDrawsExpandedCells()
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
 
     def isGoalState(self, state):
@@ -581,18 +951,23 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points. The gameState can be any
+    game state -- Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
-    This might be a useful helper function for your ApproximateSearchAgent.
+    The distance is looked up in the layout's all-pairs distance table (see
+    layout.MazeDistances), which is built once per layout, so this is cheap
+    enough to call from heuristics and evaluation functions.
+
+    Two points with no path between them are float('inf') apart, so the
+    result can always be added and compared.
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    distance = gameState.getMazeDistances().getDistance(point1, point2)
+    if distance == None: return float('inf')
+    return distance
@@ -510,7 +510,7 @@ class HeuristicTest(testClasses.TestCase):
     def execute(self, grades, moduleDict, solutionDict):
         search = moduleDict['search']
         searchAgents = moduleDict['searchAgents']
-        solutionCost = int(solutionDict['solution_cost'])
+        solutionCost = float(solutionDict['solution_cost'])   # "inf" when no path eats all the food
         problem, state, heuristic = self.setupProblem(searchAgents)
 
         passed, message = self.checkHeuristic(heuristic, problem, state, solutionCost)
@@ -535,6 +535,8 @@ class HeuristicTest(testClasses.TestCase):
         problem, _, heuristic = self.setupProblem(searchAgents)
         path = search.astar(problem, heuristic)
         cost = problem.getCostOfActions(path)
+        if not path and not problem.isGoalState(problem.getStartState()):
+            cost = float('inf')
         print "Problem solved"
 
         handle.write('solution_cost: "%s"\n' % cost)
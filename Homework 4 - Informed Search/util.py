@@ -14,7 +14,7 @@
 
 import sys
 import inspect
-import heapq, random
+import heapq, random, collections
 import cStringIO
 
 
@@ -134,6 +134,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
@@ -154,6 +157,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -185,6 +191,9 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -201,6 +210,139 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class IndexedPriorityQueue(PriorityQueue):
+    """
+      A priority queue that holds at most one live entry per key, where the
+      key of an item is given by keyFunction (the item itself by default).
+
+      update(item, priority) is a decrease-key: if an item with the same key
+      is already queued with a higher priority, its priority is lowered;
+      if it is queued with an equal or lower priority, nothing happens; and
+      otherwise the item is pushed as usual.  Replaced heap entries are
+      invalidated lazily and the heap is compacted whenever stale entries
+      outnumber live ones, so it never holds more than twice the number of
+      live items.
+    """
+    def  __init__(self, keyFunction=lambda item: item):
+        PriorityQueue.__init__(self)
+        self.keyFunction = keyFunction
+        self.entries = {}       # key -> live heap entry [priority, count, item]
+        self.stale = 0          # number of invalidated entries left in the heap
+
+    def push(self, item, priority):
+        self.update(item, priority)
+
+    def update(self, item, priority):
+        """
+          Pushes item, or lowers the priority of the queued item with the same
+          key.  Returns True if the queue changed.
+        """
+        key = self.keyFunction(item)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+            entry[2] = _REMOVED
+            self.stale += 1
+        entry = [priority, self.count, item]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        self.count += 1
+        if self.stale > len(self.entries):
+            self.heap = [e for e in self.heap if e[2] is not _REMOVED]
+            heapq.heapify(self.heap)
+            self.stale = 0
+        return True
+
+    def pop(self):
+        while True:
+            (_, _, item) = heapq.heappop(self.heap)
+            if item is not _REMOVED:
+                del self.entries[self.keyFunction(item)]
+                return item
+            self.stale -= 1
+
+    def remove(self, item):
+        "Removes the queued item with the same key, if there is one"
+        entry = self.entries.pop(self.keyFunction(item), None)
+        if entry is not None:
+            entry[2] = _REMOVED
+            self.stale += 1
+
+    def peekPriority(self):
+        "Returns the smallest priority in the queue without popping it"
+        while self.heap[0][2] is _REMOVED:
+            heapq.heappop(self.heap)
+            self.stale -= 1
+        return self.heap[0][0]
+
+    def getPriority(self, item):
+        "Returns the priority of the queued item with the same key, or None"
+        entry = self.entries.get(self.keyFunction(item))
+        if entry is None: return None
+        return entry[0]
+
+    def __contains__(self, item):
+        return self.keyFunction(item) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    The IndexedPriorityQueue counterpart of PriorityQueueWithFunction: push
+    takes only the item, and a second push of an item with the same key
+    behaves like update().
+    """
+    def  __init__(self, priorityFunction, keyFunction=lambda item: item):
+        "priorityFunction (item) -> priority, keyFunction (item) -> key"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self, keyFunction)
+
+    def push(self, item):
+        "Adds or decreases the key of an item with priority from the priority function"
+        IndexedPriorityQueue.update(self, item, self.priorityFunction(item))
+
+_REMOVED = object()     # Marks a heap entry invalidated by IndexedPriorityQueue.update
+
+class LRUCache:
+    """
+      A dictionary that holds at most maxSize entries, forgetting the least
+      recently used one to make room for a new one.  hits and misses count
+      the calls to get that found and did not find their key.
+    """
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()    # Least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        "Returns the value stored for key, or default, and marks key as just used"
+        if key in self.entries:
+            self.hits += 1
+            value = self.entries.pop(key)
+            self.entries[key] = value
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.maxSize:
+            self.entries.popitem(last=False)
+        self.entries[key] = value
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -14,10 +14,15 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
 import os
 import random
+from array import array
 
 VISIBILITY_MATRIX_CACHE = {}
+MAZE_DISTANCE_CACHE = {}
+JUNCTION_GRAPH_CACHE = {}
+NEIGHBOR_TABLE_CACHE = {}
 
 class Layout:
     """
@@ -28,13 +33,16 @@ class Layout:
         self.width = len(layoutText[0])
         self.height= len(layoutText)
         self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.mazeDistances = None
+        self.junctionGraph = None
+        self.neighborTable = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -61,6 +69,45 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getMazeDistances(self):
+        """
+        Returns the MazeDistances table for this layout's walls.  It is built
+        on first use and shared by every layout with the same walls.
+        """
+        global MAZE_DISTANCE_CACHE
+        if self.mazeDistances == None:
+            key = str(self.walls)
+            if key not in MAZE_DISTANCE_CACHE:
+                MAZE_DISTANCE_CACHE[key] = MazeDistances(self.walls)
+            self.mazeDistances = MAZE_DISTANCE_CACHE[key]
+        return self.mazeDistances
+
+    def getNeighborTable(self):
+        """
+        Returns the moves out of every open cell (see buildNeighborTable),
+        built on first use and shared by every layout with the same walls.
+        """
+        global NEIGHBOR_TABLE_CACHE
+        if self.neighborTable == None:
+            key = str(self.walls)
+            if key not in NEIGHBOR_TABLE_CACHE:
+                NEIGHBOR_TABLE_CACHE[key] = buildNeighborTable(self.walls)
+            self.neighborTable = NEIGHBOR_TABLE_CACHE[key]
+        return self.neighborTable
+
+    def getJunctionGraph(self):
+        """
+        Returns the JunctionGraph for this layout's walls, built on first use
+        and shared by every layout with the same walls.
+        """
+        global JUNCTION_GRAPH_CACHE
+        if self.junctionGraph == None:
+            key = str(self.walls)
+            if key not in JUNCTION_GRAPH_CACHE:
+                JUNCTION_GRAPH_CACHE[key] = JunctionGraph(self.walls, self.getNeighborTable())
+            self.junctionGraph = JUNCTION_GRAPH_CACHE[key]
+        return self.junctionGraph
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -90,7 +137,11 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        layout = Layout(self.layoutText[:])
+        layout.mazeDistances = self.mazeDistances
+        layout.junctionGraph = self.junctionGraph
+        layout.neighborTable = self.neighborTable
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -128,6 +179,148 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+class MazeDistances:
+    """
+    The length of the shortest path through the maze between every pair of
+    open cells, found by one breadth first search from each cell.
+
+    Open cells are numbered in x, y order and the distances are stored in a
+    flat array of unsigned shorts, so a lookup is two dictionary reads and an
+    array index.
+    """
+    UNREACHABLE = 0xFFFF
+
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.cellIndex = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.numCells = len(self.cells)
+
+        n = self.numCells
+        neighbors = []
+        for x, y in self.cells:
+            adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbors.append([self.cellIndex[cell] for cell in adjacent if cell in self.cellIndex])
+
+        unreachable = MazeDistances.UNREACHABLE
+        distances = array('H', [unreachable]) * (n * n)
+        for source in range(n):
+            row = source * n
+            distances[row + source] = 0
+            frontier = [source]
+            distance = 0
+            while frontier:
+                distance += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] == unreachable:
+                            distances[row + neighbor] = distance
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+        self.distances = distances
+
+    def _index(self, pos):
+        index = self.cellIndex.get(pos)
+        if index == None:
+            # Scared ghosts can sit between grid points
+            x, y = pos
+            index = self.cellIndex.get((int(x + 0.5), int(y + 0.5)))
+            if index == None: raise Exception('No open cell at ' + str(pos))
+        return index
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two positions, or None if there is
+        no path between them.  Positions off the grid points are rounded to
+        the nearest one.
+        """
+        distance = self.distances[self._index(pos1) * self.numCells + self._index(pos2)]
+        if distance == MazeDistances.UNREACHABLE: return None
+        return distance
+
+def buildNeighborTable(walls):
+    """
+    Returns a dictionary from each open cell to a tuple of the (next cell,
+    action) pairs for the moves out of it, tried North, South, East then
+    West, so a successor function is one lookup.
+    """
+    table = {}
+    for x in range(walls.width):
+        for y in range(walls.height):
+            if not walls[x][y]:
+                table[(x, y)] = cellNeighbors(walls, (x, y))
+    return table
+
+def cellNeighbors(walls, cell):
+    """
+    Returns the (next cell, action) pairs for the moves out of cell into open
+    cells, tried North, South, East then West.  cell may itself be a wall.
+    """
+    from game import Directions, Actions
+    x, y = cell
+    neighbors = []
+    for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+        dx, dy = Actions.directionToVector(action)
+        nextx, nexty = int(x + dx), int(y + dy)
+        if not walls[nextx][nexty]:
+            neighbors.append(((nextx, nexty), action))
+    return tuple(neighbors)
+
+class JunctionGraph:
+    """
+    The maze with every one cell wide corridor contracted into a single
+    weighted edge.
+
+    Junctions are the open cells that do not have exactly two open
+    neighbours: dead ends, branches and the inside of open areas.  Each edge
+    runs from a junction along a corridor to the next junction and keeps the
+    Directions it expands to and the cells it enters, so its weight is the
+    number of moves.  A corridor that loops back on itself without meeting a
+    junction gets one of its cells promoted to a junction.
+    """
+
+    def __init__(self, walls, neighbors=None):
+        if neighbors == None: neighbors = buildNeighborTable(walls)
+        self.neighbors = neighbors                                  # Cell -> ((next cell, action), ...), see buildNeighborTable
+
+        self.junctions = set([cell for cell, neighbors in self.neighbors.items() if len(neighbors) != 2])
+        self.edges = {}                                             # Junction -> [(next junction, actions, cells entered)]
+        self.corridorEdges = {}                                     # Corridor cell -> [(junction, edge index)] of the edges through it
+        for junction in list(self.junctions):
+            self.addEdges(junction)
+        for cell in sorted(self.neighbors):
+            if cell not in self.junctions and cell not in self.corridorEdges:
+                self.junctions.add(cell)
+                self.addEdges(cell)
+
+    def addEdges(self, junction):
+        self.edges[junction] = []
+        for nextCell, action in self.neighbors[junction]:
+            edge = self.corridor(junction, action)
+            for cell in edge[2][:-1]:
+                self.corridorEdges.setdefault(cell, []).append((junction, len(self.edges[junction])))
+            self.edges[junction].append(edge)
+
+    def corridor(self, cell, action, stops=()):
+        """
+        Walks from cell by action and then along the corridor until it reaches
+        a junction or one of stops.  Returns (end cell, actions, cells
+        entered) with the end cell last in cells entered.
+        """
+        previous = cell
+        for cell, firstAction in self.neighbors[cell]:
+            if firstAction == action: break
+        actions, cells = [action], [cell]
+        while cell not in self.junctions and cell not in stops:
+            for nextCell, action in self.neighbors[cell]:
+                if nextCell != previous: break
+            previous, cell = cell, nextCell
+            actions.append(action)
+            cells.append(cell)
+        return cell, tuple(actions), tuple(cells)
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
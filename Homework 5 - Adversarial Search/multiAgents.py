@@ -14,7 +14,7 @@
 
 from util import manhattanDistance
 from game import Directions
-import random, util
+import random, util, time
 
 from game import Agent
 
@@ -28,6 +28,206 @@ def scoreEvaluationFunction(currentGameState):
     """
     return currentGameState.getScore()
 
+# Kinds of transposition table entries
+EXACT = 0       # The stored value is the minimax value of the position
+LOWERBOUND = 1  # The search failed high; the value is at least the stored one
+UPPERBOUND = 2  # The search failed low; the value is at most the stored one
+
+class TranspositionTable:
+    """
+      A bounded cache of search results, so positions reached through
+      different move orders are only searched once.
+
+      Entries are keyed on (state hash, depth, agent index) and hold a
+      (kind, value, action, depthLimited) tuple, where kind is one of EXACT,
+      LOWERBOUND or UPPERBOUND and depthLimited is whether the search below
+      the entry was cut off by depth, so that a later iteration answered
+      from the table still knows a deeper search might change the result.
+      The state hash XORs a random 64-bit Zobrist key for each agent's
+      position, direction and scared timer and for each remaining capsule,
+      and pairs it with the food grid's hash and the score, which are cheap
+      to take from the game state.
+
+      The table keeps two generations of entries.  New entries go into the
+      recent one; once it holds half of size entries it becomes the older
+      one and the previous older generation is dropped.  Entries found in
+      the older generation are moved back to the recent one, so the table
+      never holds more than size entries and evicts the least recently
+      used ones first.
+    """
+    def __init__(self, size):
+        self.size = max(2, int(size))
+        self.recent = {}
+        self.older = {}
+        self.zobristKeys = {}
+        self.random = random.Random(0)  # Private generator; leaves the game's random state alone
+        self.probes = 0
+        self.hits = 0
+
+    def zobristKey(self, feature):
+        "Returns the random 64-bit key for one feature of a state"
+        key = self.zobristKeys.get(feature)
+        if key == None:
+            key = self.random.getrandbits(64)
+            self.zobristKeys[feature] = key
+        return key
+
+    def stateHash(self, state):
+        data = state.data
+        h = 0
+        for index, agentState in enumerate(data.agentStates):
+            conf = agentState.configuration
+            h ^= self.zobristKey((index, conf.pos, conf.direction, agentState.scaredTimer))
+        for capsule in data.capsules:
+            h ^= self.zobristKey(capsule)
+        return (h, hash(data.food), data.score)
+
+    def key(self, state, depth, index):
+        return (self.stateHash(state), depth, index)
+
+    def get(self, key):
+        "Returns the (kind, value, action) entry stored under key, or None"
+        self.probes += 1
+        entry = self.recent.get(key)
+        if entry == None:
+            entry = self.older.pop(key, None)
+            if entry == None: return None
+            self.put(key, entry)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.recent[key] = entry
+        if len(self.recent) >= self.size / 2:
+            self.older = self.recent
+            self.recent = {}
+
+    def __len__(self):
+        return len(self.recent) + len(self.older)
+
+class MoveOrdering:
+    """
+      Decides the order in which an AlphaBetaAgent tries the moves at each
+      node, so that the moves most likely to cause a cutoff come first.
+      Three heuristics can be combined:
+
+      evalPlies - at nodes fewer than this many plies below the root, every
+                  successor is generated and evaluated, and the moves are
+                  sorted best first for the agent to move (highest value for
+                  Pacman, lowest for a ghost).  The generated successors are
+                  handed back so they are not generated twice.
+      killers   - the last two moves that caused a cutoff at each ply are
+                  tried first wherever they are legal.
+      history   - every cutoff adds the square of the remaining plies to a
+                  score for (agent, position, move), and the other moves are
+                  tried highest score first.
+
+      Any object with the same orderMoves, recordCutoff and newSearch
+      methods can be plugged into AlphaBetaAgent.moveOrdering instead.
+    """
+    def __init__(self, evaluationFunction, evalPlies=0, killers=False, history=False):
+        self.evaluationFunction = evaluationFunction
+        self.evalPlies = evalPlies
+        self.killers = killers
+        self.history = history
+        self.killerMoves = {}               # ply -> up to two moves that caused cutoffs
+        self.historyScores = util.Counter() # (agent index, position, move) -> score
+
+    def newSearch(self):
+        "Called at the start of every search from a new root"
+        self.killerMoves = {}
+        for key in self.historyScores.keys():
+            self.historyScores[key] /= 2    # Older cutoffs count for less
+
+    def agentPosition(self, state, index):
+        if index == 0: return state.getPacmanPosition()
+        return state.getGhostPosition(index)
+
+    def orderMoves(self, state, index, actions, ply):
+        """
+          Returns a list of (action, successor) pairs in the order they should
+          be tried, where successor is None if it has not been generated yet.
+        """
+        if ply < self.evalPlies:
+            scored = []
+            for action in actions:
+                successor = state.generateSuccessor(index, action)
+                scored.append((self.evaluationFunction(successor), action, successor))
+            scored.sort(key=lambda entry: entry[0], reverse=(index == 0))
+            return [(action, successor) for v, action, successor in scored]
+        if not self.killers and not self.history:
+            return [(action, None) for action in actions]
+        killers = []
+        if self.killers:
+            killers = self.killerMoves.get(ply, [])
+        position = None
+        if self.history:
+            position = self.agentPosition(state, index)
+        def rank(action):
+            if action in killers: killerRank = killers.index(action)
+            else: killerRank = len(killers)
+            return (killerRank, -self.historyScores[(index, position, action)])
+        return [(action, None) for action in sorted(actions, key=rank)]
+
+    def recordCutoff(self, state, index, action, ply, remainingPlies):
+        "Called when trying action at this node caused a cutoff"
+        if self.killers:
+            killers = self.killerMoves.setdefault(ply, [])
+            if action in killers: killers.remove(action)
+            killers.insert(0, action)
+            del killers[2:]
+        if self.history:
+            self.historyScores[(index, self.agentPosition(state, index), action)] += remainingPlies ** 2
+
+class SearchTimeout(Exception):
+    "Raised from inside a search once its deadline has passed"
+    pass
+
+# State of a worker process in a parallel search; see MultiAgentSearchAgent.parallelSearch
+_workerAgent = None
+_workerStateClass = None
+_workerAlpha = None     # multiprocessing.Value holding the best root value found so far
+_workerLayouts = {}     # layout text -> Layout, so each layout is only rebuilt once
+
+def _initWorker(agent, stateClass, sharedAlpha):
+    "Runs once in each worker process; the arguments are inherited, not pickled"
+    global _workerAgent, _workerStateClass, _workerAlpha
+    _workerAgent = agent
+    _workerStateClass = stateClass
+    _workerAlpha = sharedAlpha
+
+def _searchSubtree(task):
+    """
+      Searches the subtree below one root action in a worker process and
+      returns (task number, value or None on timeout, alpha used, whether the
+      depth limit was reached, search stats or None).
+    """
+    import layout
+    taskNumber, packed, layoutText, depth, deadline = task
+    agent = _workerAgent
+    if layoutText not in _workerLayouts:
+        _workerLayouts[layoutText] = layout.Layout(list(layoutText))
+    state = _workerStateClass.unpack(packed, _workerLayouts[layoutText])
+    agent.depthLimitReached = False
+    if hasattr(agent, 'stats'):
+        agent.stats = util.Counter()
+    alpha = float('-inf')
+    try:
+        if agent.sharesAlpha:
+            alpha = _workerAlpha.value
+            v = agent.search(state, depth, None, deadline, 1, alpha)[0]
+            if v > alpha:   # An exact value, so other subtrees can prune against it
+                _workerAlpha.acquire()
+                if v > _workerAlpha.value:
+                    _workerAlpha.value = v
+                _workerAlpha.release()
+        else:
+            v = agent.search(state, depth, None, deadline, 1)[0]
+    except SearchTimeout:
+        v = None
+    _workerStateClass.getAndResetExplored()     # Keep the worker's explored set from growing
+    return (taskNumber, v, alpha, agent.depthLimitReached, getattr(agent, 'stats', None))
+
 class MultiAgentSearchAgent(Agent):
     """
       This class provides some common elements to all of your
@@ -41,12 +241,140 @@ class MultiAgentSearchAgent(Agent):
       Note: this is an abstract class: one that should not be instantiated.  It's
       only partially specified, and designed to be extended.  Agent (game.py)
       is another abstract class.
+
+      Passing a positive tableSize (e.g. -a depth=3,tableSize=200000) gives
+      the agent a TranspositionTable of that many entries, kept across
+      moves.  It is off by default.
+
+      Passing a positive timeLimit in seconds (e.g. -a timeLimit=0.5) turns
+      on iterative deepening: depth is then ignored and each move searches
+      as deep as the time allows.  Keep it well below the game's --timeout.
+
+      Passing workers greater than 1 (e.g. -a depth=4,workers=4) splits each
+      search at the root: the subtree below every Pacman move is searched in
+      a pool of that many processes, and the move is chosen exactly as the
+      serial search would choose it.  See parallelSearch.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    sharesAlpha = False     # Whether search takes the alpha of a parallel root split
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', tableSize = '0', timeLimit = '0', workers = '0'):
         self.index = 0 # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        self.transpositionTable = None
+        if int(tableSize) > 0:
+            self.transpositionTable = TranspositionTable(int(tableSize))
+        self.timeLimit = None
+        if float(timeLimit) > 0:
+            self.timeLimit = float(timeLimit)
+        self.depthLimitReached = False  # Set by search when some branch was cut off by depth
+        self.completedDepth = 0         # Depth of the last search that ran to completion
+        self.workers = int(workers)
+        self.pool = None                # Created on the first parallel search
+        self.sharedAlpha = None
+
+    def chooseAction(self, gameState):
+        """
+          Returns the action found by self.search.  With no timeLimit this is
+          a single search to self.depth.  Otherwise the agent deepens one ply
+          at a time, trying the previous iteration's best action first, until
+          timeLimit seconds have passed or a search no longer reaches the
+          depth limit, and returns the best action of the last depth it
+          completed.
+        """
+        if self.timeLimit == None:
+            action = self.runSearch(gameState, self.depth)[1]
+            self.completedDepth = self.depth
+            return action
+        deadline = time.time() + self.timeLimit
+        depth = 1
+        self.depthLimitReached = False
+        action = self.runSearch(gameState, depth)[1]    # Always finish one ply so there is a move to make
+        while self.depthLimitReached and time.time() < deadline:
+            self.depthLimitReached = False
+            try:
+                action = self.runSearch(gameState, depth + 1, action, deadline)[1]
+            except SearchTimeout:
+                break
+            depth += 1
+        self.completedDepth = depth
+        return action
+
+    def runSearch(self, gameState, depth, firstAction=None, deadline=None):
+        "Runs search, or parallelSearch when there is more than one worker"
+        if self.workers > 1:
+            return self.parallelSearch(gameState, depth, firstAction, deadline)
+        return self.search(gameState, depth, firstAction, deadline)
+
+    def rootActions(self, gameState, firstAction=None):
+        "Returns Pacman's legal actions in the order search tries them at the root"
+        actions = gameState.getLegalActions(0)
+        if firstAction in actions:
+            actions = [firstAction] + [a for a in actions if a != firstAction]
+        return actions
+
+    def parallelSearch(self, gameState, depth, firstAction=None, deadline=None):
+        """
+          Same as search, but the subtree below each root action is searched
+          by a pool of self.workers processes.  States are sent to the workers
+          as GameState.pack() tuples along with the layout text.
+
+          Agents with sharesAlpha (alpha-beta) share the best root value
+          found so far through a multiprocessing.Value, and each subtree is
+          searched with the alpha it read when it started.  A subtree whose
+          value is no better than its alpha is only an upper bound, so if it
+          could tie the best value and comes before it in root order, it is
+          searched again with a full window.  That way the action returned is
+          always the first best one in root order, as in the serial search.
+        """
+        import multiprocessing
+        if self.pool == None:
+            self.sharedAlpha = multiprocessing.Value('d', float('-inf'))
+            self.pool = multiprocessing.Pool(self.workers, _initWorker, (self, gameState.__class__, self.sharedAlpha))
+        self.sharedAlpha.value = float('-inf')
+        self.agents = gameState.getNumAgents()
+
+        actions = self.rootActions(gameState, firstAction)
+        layoutText = tuple(gameState.data.layout.layoutText)
+        tasks = []
+        for i, action in enumerate(actions):
+            packed = gameState.generateSuccessor(0, action).pack()
+            tasks.append((i, packed, layoutText, depth, deadline))
+
+        results = [None] * len(tasks)
+        timedOut = False
+        for taskNumber, v, alpha, depthLimitReached, stats in self.pool.imap_unordered(_searchSubtree, tasks):
+            results[taskNumber] = (v, alpha)
+            if v == None: timedOut = True
+            if depthLimitReached: self.depthLimitReached = True
+            if stats != None:
+                for key in stats: self.stats[key] += stats[key]
+        if timedOut:
+            raise SearchTimeout()
+
+        best = max([v for v, alpha in results])
+        for i, action in enumerate(actions):
+            v, alpha = results[i]
+            if v == best and v <= alpha:    # Only a bound; it may or may not tie the best
+                v = self.search(gameState.generateSuccessor(0, action), depth, None, deadline, 1)[0]
+            if v == best:
+                return (v, action)
+
+    def search(self, gameState, depth, firstAction=None, deadline=None, rootIndex=0):
+        """
+          Searches from gameState to the given depth and returns a
+          (value, action) pair.  If firstAction is legal it is tried first at
+          the root, and once time.time() passes deadline the search raises
+          SearchTimeout.  rootIndex is the agent to move at gameState; it is
+          only nonzero in the subtree searches of parallelSearch.
+        """
+        util.raiseNotDefined()
+
+    def final(self, state):
+        if self.pool != None:
+            self.pool.terminate()
+            self.pool = None
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
@@ -71,7 +399,26 @@ class MinimaxAgent(MultiAgentSearchAgent):
             Returns the total number of agents in the game
         """
         "*** YOUR CODE HERE ***"
+        return self.chooseAction(gameState)
+
+    def search(self, gameState, depth, firstAction=None, deadline=None, rootIndex=0):
+        """
+          Runs minimax search from gameState to the given depth; see
+          MultiAgentSearchAgent.search
+        """
         self.agents = gameState.getNumAgents()  # Used to reset the index
+        table = self.transpositionTable         # None unless a tableSize was given
+
+        """
+        legalActions()
+        Returns the legal actions for the agent at index, with firstAction
+        moved to the front when state is the root of the search
+        """
+        def legalActions(state, index):
+            actions = state.getLegalActions(index)
+            if state is gameState and firstAction in actions:
+                actions = [firstAction] + [a for a in actions if a != firstAction]
+            return actions
 
         """
         value()
@@ -83,8 +430,12 @@ class MinimaxAgent(MultiAgentSearchAgent):
         Logic:
         - if the index value is the same as the number of agent,
             reset the index to 0 and subtract 1 from the depth to signify a new partially
+        - if the deadline has passed, abandon the search
         - if the state is a terminal state or the depth limit has been reached,
             return the evaluation function of the state with a None for consistency
+        - if the state has already been searched to this depth for this agent,
+            return the value stored in the transposition table, raising
+            depthLimitReached again if that search was cut off by depth
         - if the index value is 0,
             this represents the state as Pacman's and return the maxValue function
         - if the index value is greater than 0,
@@ -94,12 +445,29 @@ class MinimaxAgent(MultiAgentSearchAgent):
             if index >= (self.agents):
                 index = 0
                 depth -= 1
+            if deadline != None and time.time() > deadline:
+                raise SearchTimeout()
+            if depth == 0:
+                self.depthLimitReached = True   # A deeper search might change the result
             if state.isWin() or state.isLose() or depth == 0:
                 return (self.evaluationFunction(state), None)
+            if table != None:
+                key = table.key(state, depth, index)
+                entry = table.get(key)
+                if entry != None:
+                    if entry[3]: self.depthLimitReached = True
+                    return (entry[1], entry[2])
+            outerLimitReached = self.depthLimitReached
+            self.depthLimitReached = False
             if index == 0: # Pacman
-                return maxValue(state, depth, index)
-            if index > 0:  # Ghost
-                return minValue(state, depth, index)
+                result = maxValue(state, depth, index)
+            else:          # Ghost
+                result = minValue(state, depth, index)
+            depthLimited = self.depthLimitReached
+            self.depthLimitReached = depthLimited or outerLimitReached
+            if table != None:
+                table.put(key, (EXACT, result[0], result[1], depthLimited))
+            return result
 
         """
         maxValue()
@@ -117,7 +485,7 @@ class MinimaxAgent(MultiAgentSearchAgent):
         """
         def maxValue(state, depth, index):
             maxV = (float('-inf'), None)
-            for action in state.getLegalActions(index):
+            for action in legalActions(state, index):
                 cur = value(state.generateSuccessor(index, action), depth, index+1)
                 if cur[0] > maxV[0]:
                     maxV = (cur[0], action)
@@ -145,22 +513,127 @@ class MinimaxAgent(MultiAgentSearchAgent):
                     minV = (cur[0], action)
             return minV
 
-        return value(gameState, self.depth, 0)[1]
-        util.raiseNotDefined()
+        return value(gameState, depth, rootIndex)
 
 
 
 class AlphaBetaAgent(MultiAgentSearchAgent):
     """
       Your minimax agent with alpha-beta pruning (question 3)
+
+      Moves are tried in getLegalActions order unless a MoveOrdering is
+      turned on with any of evalPlies=<plies>, killers=1 or history=1, e.g.
+      -a depth=3,evalPlies=1,killers=1,history=1.  The agent always counts
+      the nodes it expands, the successors it generates and the cutoffs it
+      makes (see getStats); pass stats=1 to print them when the game ends.
+      With workers, each worker process keeps its own killer moves and
+      history scores.
     """
 
+    sharesAlpha = True
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', tableSize = '0', timeLimit = '0',
+                 evalPlies = '0', killers = '0', history = '0', stats = '0', workers = '0'):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, tableSize, timeLimit, workers)
+        self.moveOrdering = None
+        if int(evalPlies) > 0 or int(killers) or int(history):
+            self.moveOrdering = MoveOrdering(self.evaluationFunction, int(evalPlies), bool(int(killers)), bool(int(history)))
+        self.printStats = bool(int(stats))
+        self.stats = util.Counter()
+
+    def getStats(self):
+        """
+          Returns the search counters summed over all moves so far, along
+          with the fraction of expanded nodes that were cut off and the
+          fraction of cutoffs that came from the first move tried.
+        """
+        stats = self.stats.copy()
+        stats['cutoffRate'] = stats['cutoffs'] / float(max(1, stats['nodes']))
+        stats['firstMoveCutoffRate'] = stats['firstMoveCutoffs'] / float(max(1, stats['cutoffs']))
+        return stats
+
+    def rootActions(self, gameState, firstAction=None):
+        "Returns Pacman's legal actions in the order search tries them at the root"
+        actions = gameState.getLegalActions(0)
+        if self.moveOrdering != None:
+            actions = [move[0] for move in self.moveOrdering.orderMoves(gameState, 0, actions, 0)]
+        if firstAction in actions:
+            actions = [firstAction] + [a for a in actions if a != firstAction]
+        return actions
+
+    def final(self, state):
+        MultiAgentSearchAgent.final(self, state)
+        if self.printStats:
+            stats = self.getStats()
+            print 'Alpha-beta nodes expanded: %d, successors generated: %d' % (stats['nodes'], stats['generated'])
+            print 'Cutoffs: %d (%.1f%% of nodes, %.1f%% on the first move)' % \
+                (stats['cutoffs'], 100 * stats['cutoffRate'], 100 * stats['firstMoveCutoffRate'])
+
     def getAction(self, gameState):
         """
           Returns the minimax action using self.depth and self.evaluationFunction
         """
         "*** YOUR CODE HERE ***"
+        return self.chooseAction(gameState)
+
+    def search(self, gameState, depth, firstAction=None, deadline=None, rootIndex=0, alpha=float('-inf')):
+        """
+          Runs alpha-beta search from gameState to the given depth, starting
+          from the given alpha; see MultiAgentSearchAgent.search
+        """
         self.agents = gameState.getNumAgents()  # Used to reset the index
+        table = self.transpositionTable         # None unless a tableSize was given
+        ordering = self.moveOrdering            # None unless move ordering was turned on
+        stats = self.stats
+        rootDepth = depth
+        if ordering != None:
+            ordering.newSearch()
+
+        """
+        plyOf()
+        Returns how many plies below the root a node is, and how many plies
+        of search remain below it
+        """
+        def plyOf(depth, index):
+            return ((rootDepth - depth) * self.agents + index, (depth - 1) * self.agents + self.agents - index)
+
+        """
+        orderedMoves()
+        Returns (action, successor) pairs for the agent at index in the order
+        the move ordering chose, with firstAction moved to the front when state
+        is the root of the search; successor is None if not generated yet
+        """
+        def orderedMoves(state, depth, index):
+            actions = state.getLegalActions(index)
+            if ordering == None:
+                moves = [(action, None) for action in actions]
+            else:
+                moves = ordering.orderMoves(state, index, actions, plyOf(depth, index)[0])
+                stats['generated'] += len([move for move in moves if move[1] != None])
+            if state is gameState and firstAction in actions:
+                moves = [move for move in moves if move[0] == firstAction] + [move for move in moves if move[0] != firstAction]
+            return moves
+
+        """
+        successorOf()
+        Returns the successor from an ordered move, generating it if needed
+        """
+        def successorOf(state, index, move):
+            if move[1] != None: return move[1]
+            stats['generated'] += 1
+            return state.generateSuccessor(index, move[0])
+
+        """
+        cutoff()
+        Counts a cutoff caused by the i-th move tried and tells the move
+        ordering about it
+        """
+        def cutoff(state, depth, index, action, i):
+            stats['cutoffs'] += 1
+            if i == 0: stats['firstMoveCutoffs'] += 1
+            if ordering != None:
+                ply, remaining = plyOf(depth, index)
+                ordering.recordCutoff(state, index, action, ply, remaining)
 
         """
         value()
@@ -174,24 +647,63 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         Logic:
         - if the index value is the same as the number of agent,
             reset the index to 0 and subtract 1 from the depth to signify a new partially
+        - if the deadline has passed, abandon the search
         - if the state is a terminal state or the depth limit has been reached,
             return the evaluation function of the state with a None for consistency
+        - if the state is in the transposition table, return an exact value,
+            or use a bound to narrow alpha or beta and return once they cross;
+            either way, raise depthLimitReached again if the stored search was
+            cut off by depth
         - if the index value is 0,
             this represents the state as Pacman's and return the maxValue function
         - if the index value is greater than 0,
             this represents any number of ghosts and return the minValue function for the current index
+        - store the result as exact, or as a bound if it fell outside alpha and beta
 
         """
         def value(state, depth, index, alpha, beta):
             if index >= (self.agents):
                 index = 0
                 depth -= 1
+            if deadline != None and time.time() > deadline:
+                raise SearchTimeout()
+            if depth == 0:
+                self.depthLimitReached = True   # A deeper search might change the result
             if state.isWin() or state.isLose() or depth == 0:
                 return (self.evaluationFunction(state), None)
+            if table != None:
+                key = table.key(state, depth, index)
+                entry = table.get(key)
+                alphaOrig = alpha
+                if entry != None:
+                    kind, v, action, depthLimited = entry
+                    if kind == EXACT:
+                        if depthLimited: self.depthLimitReached = True
+                        return (v, action)
+                    if kind == LOWERBOUND:
+                        alpha = max(alpha, v)
+                    else:
+                        beta = min(beta, v)
+                    if alpha >= beta:
+                        if depthLimited: self.depthLimitReached = True
+                        return (v, action)
+            outerLimitReached = self.depthLimitReached
+            self.depthLimitReached = False
             if index == 0: # Pacman
-                return maxValue(state, depth, index, alpha, beta)
-            if index > 0:  # Ghost
-                return minValue(state, depth, index, alpha, beta)
+                result = maxValue(state, depth, index, alpha, beta)
+            else:          # Ghost
+                result = minValue(state, depth, index, alpha, beta)
+            depthLimited = self.depthLimitReached
+            self.depthLimitReached = depthLimited or outerLimitReached
+            if table != None:
+                if result[0] <= alphaOrig:
+                    kind = UPPERBOUND
+                elif result[0] >= beta:
+                    kind = LOWERBOUND
+                else:
+                    kind = EXACT
+                table.put(key, (kind, result[0], result[1], depthLimited))
+            return result
 
         """
         maxValue()
@@ -204,20 +716,23 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
 
         Logic:
         - initialize a default maxV to negative infinity and None for consistency
-        - for each action the agent can take, get the value of the successor,
-            pass in the current index + 1 to represent the next agent
+        - for each action the agent can take, in the chosen order, get the value
+            of the successor, pass in the current index + 1 to represent the next agent
         - if the value of the action is greater than the current maxV
             set maxV to the current score and action
-        - if maxV is greater than beta, return maxV
+        - if maxV is greater than beta, record the cutoff and return maxV
         - set alpha to the max of the current alpha and maxV
         """
         def maxValue(state, depth, index, alpha, beta):
             maxV = (float('-inf'), None)
-            for action in state.getLegalActions(index):
-                cur = value(state.generateSuccessor(index, action), depth, index+1, alpha, beta)
+            stats['nodes'] += 1
+            for i, move in enumerate(orderedMoves(state, depth, index)):
+                action = move[0]
+                cur = value(successorOf(state, index, move), depth, index+1, alpha, beta)
                 if cur[0] > maxV[0]:
                     maxV = (cur[0], action)
                 if maxV[0] > beta:
+                    cutoff(state, depth, index, action, i)
                     return maxV
                 alpha = max(alpha, maxV[0])
             return maxV
@@ -233,26 +748,28 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
 
         Logic:
         - initialize a default minV to positive infinity and None for consistency
-        - for each action the agent can take, get the value of the successor,
-            pass in the current index + 1 to represent the next agent
+        - for each action the agent can take, in the chosen order, get the value
+            of the successor, pass in the current index + 1 to represent the next agent
         - if the value of the action is less than the current minV
             set minV to the current score and action
-        - if minV is less than alpha, return minV
+        - if minV is less than alpha, record the cutoff and return minV
         - set beta to the min of the current beta and minV
         """
         def minValue(state, depth, index, alpha, beta):
             minV = (float('+inf'), None)
-            for action in state.getLegalActions(index):
-                cur = value(state.generateSuccessor(index, action), depth, index+1, alpha, beta)
+            stats['nodes'] += 1
+            for i, move in enumerate(orderedMoves(state, depth, index)):
+                action = move[0]
+                cur = value(successorOf(state, index, move), depth, index+1, alpha, beta)
                 if cur[0] < minV[0]:
                     minV = (cur[0], action)
                 if minV[0] < alpha:
+                    cutoff(state, depth, index, action, i)
                     return minV
                 beta = min(beta, minV[0])
             return minV
 
-        return value(gameState, self.depth, 0, float('-inf'), float('inf'))[1]
-        util.raiseNotDefined()
+        return value(gameState, depth, rootIndex, alpha, float('inf'))
 
 class ExpectimaxAgent(MultiAgentSearchAgent):
     """
@@ -267,7 +784,26 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
           legal moves.
         """
         "*** YOUR CODE HERE ***"
+        return self.chooseAction(gameState)
+
+    def search(self, gameState, depth, firstAction=None, deadline=None, rootIndex=0):
+        """
+          Runs expectimax search from gameState to the given depth; see
+          MultiAgentSearchAgent.search
+        """
         self.agents = gameState.getNumAgents() #Used to reset the index
+        table = self.transpositionTable        # None unless a tableSize was given
+
+        """
+        legalActions()
+        Returns the legal actions for the agent at index, with firstAction
+        moved to the front when state is the root of the search
+        """
+        def legalActions(state, index):
+            actions = state.getLegalActions(index)
+            if state is gameState and firstAction in actions:
+                actions = [firstAction] + [a for a in actions if a != firstAction]
+            return actions
 
         """
         value()
@@ -279,8 +815,12 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         Logic:
         - if the index value is the same as the number of agent,
             reset the index to 0 and subtract 1 from the depth to signify a new partially
+        - if the deadline has passed, abandon the search
         - if the state is a terminal state or the depth limit has been reached,
             return the evaluation function of the state with a None for consistency
+        - if the state has already been searched to this depth for this agent,
+            return the value stored in the transposition table, raising
+            depthLimitReached again if that search was cut off by depth
         - if the index value is 0,
             this represents the state as Pacman's and return the maxValue function
         - if the index value is greater than 0,
@@ -291,12 +831,29 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
             if index >= (self.agents):
                 index = 0
                 depth -= 1
+            if deadline != None and time.time() > deadline:
+                raise SearchTimeout()
+            if depth == 0:
+                self.depthLimitReached = True   # A deeper search might change the result
             if state.isWin() or state.isLose() or depth == 0:
                 return (self.evaluationFunction(state), None)
+            if table != None:
+                key = table.key(state, depth, index)
+                entry = table.get(key)
+                if entry != None:
+                    if entry[3]: self.depthLimitReached = True
+                    return (entry[1], entry[2])
+            outerLimitReached = self.depthLimitReached
+            self.depthLimitReached = False
             if index == 0: # Pacman
-                return maxValue(state, depth, index)
-            if index > 0:  # Ghost
-                return expValue(state, depth, index)
+                result = maxValue(state, depth, index)
+            else:          # Ghost
+                result = expValue(state, depth, index)
+            depthLimited = self.depthLimitReached
+            self.depthLimitReached = depthLimited or outerLimitReached
+            if table != None:
+                table.put(key, (EXACT, result[0], result[1], depthLimited))
+            return result
 
         """
         maxValue()
@@ -314,7 +871,7 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         """
         def maxValue(state, depth, index):
             maxV = (float('-inf'), None)
-            for action in state.getLegalActions(index):
+            for action in legalActions(state, index):
                 cur = value(state.generateSuccessor(index, action), depth, index+1)
                 if cur[0] > maxV[0]:
                     maxV = (cur[0], action)
@@ -342,8 +899,7 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
                 expV = (expV[0] + (p * value(state.generateSuccessor(index, action), depth, index+1)[0]), action)
             return expV
 
-        return value(gameState, self.depth, 0)[1]
-        util.raiseNotDefined()
+        return value(gameState, depth, rootIndex)
 
 def betterEvaluationFunction(currentGameState):
     """